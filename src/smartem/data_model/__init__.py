@@ -1,3 +1,4 @@
+import functools
 import os
 from pathlib import Path
 from typing import Any, List, Optional, Type, Union, cast
@@ -5,12 +6,17 @@ from typing import Any, List, Optional, Type, Union, cast
 import yaml
 from sqlalchemy import Column
 from sqlalchemy import Float as Float_org
-from sqlalchemy import ForeignKey, Integer, Text, create_engine, inspect
+from sqlalchemy import ForeignKey, Index, Integer, Text, create_engine, inspect
 from sqlalchemy.exc import ProgrammingError
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import relationship
 from sqlalchemy.sql.type_api import TypeEngine
 
+try:
+    from yaml import CSafeLoader as SafeLoader
+except ImportError:
+    from yaml import SafeLoader  # type: ignore
+
 # this is a mypy workaround suggeted in https://github.com/dropbox/sqlalchemy-stubs/issues/178
 Float = cast(Type[TypeEngine[float]], Float_org)
 
@@ -197,6 +203,14 @@ class InfoStore:
 
 class ParticleInfo(InfoStore, Base):
     __tablename__ = "ParticleInfo"
+    __table_args__ = (
+        Index(
+            "ix_ParticleInfo_key_particle_id",
+            "key",
+            "particle_id",
+            postgresql_include=["value"],
+        ),
+    )
 
     particle_id: Column = Column(
         ForeignKey("Particle.particle_id"), primary_key=True, index=True
@@ -206,6 +220,14 @@ class ParticleInfo(InfoStore, Base):
 
 class ExposureInfo(InfoStore, Base):
     __tablename__ = "ExposureInfo"
+    __table_args__ = (
+        Index(
+            "ix_ExposureInfo_key_exposure_name",
+            "key",
+            "exposure_name",
+            postgresql_include=["value"],
+        ),
+    )
 
     exposure_name: Column = Column(
         ForeignKey("Exposure.exposure_name"), primary_key=True, index=True
@@ -237,6 +259,14 @@ class ParticleSet(Base):
 
 class ParticleSetInfo(InfoStore, Base):
     __tablename__ = "ParticleSetInfo"
+    __table_args__ = (
+        Index(
+            "ix_ParticleSetInfo_key_set_name",
+            "key",
+            "set_name",
+            postgresql_include=["value"],
+        ),
+    )
 
     set_name: Column = Column(
         ForeignKey("ParticleSet.identifier"), primary_key=True, index=True
@@ -283,8 +313,13 @@ def url(credentials_file: Optional[Union[str, Path]] = None) -> str:
             "No credentials file specified for smartem database (environment variable SMARTEM_CREDENTIALS)"
         )
 
+    return _url(os.path.abspath(credentials_file))
+
+
+@functools.lru_cache(maxsize=4)
+def _url(credentials_file: str) -> str:
     with open(credentials_file, "r") as stream:
-        creds = yaml.safe_load(stream)
+        creds = yaml.load(stream, Loader=SafeLoader)
 
     return f"postgresql+psycopg2://{creds['username']}:{creds['password']}@{creds['host']}:{creds['port']}/{creds['database']}"
 
@@ -294,6 +329,9 @@ def setup():
     for tab in _tables:
         if not inspect(engine).has_table(tab.__tablename__):
             tab.__table__.create(engine)
+        else:
+            for index in tab.__table__.indexes:
+                index.create(engine, checkfirst=True)
 
 
 def teardown():
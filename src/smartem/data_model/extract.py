@@ -1,9 +1,26 @@
-from typing import Any, List, Optional, Sequence, Set, Tuple, Type, Union
+import threading
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from typing import (
+    Any,
+    Callable,
+    Dict,
+    Iterator,
+    List,
+    Optional,
+    Sequence,
+    Set,
+    Tuple,
+    Type,
+    Union,
+)
 
-from sqlalchemy import create_engine, delete, select
-from sqlalchemy.dialects.postgresql import insert
+import numpy as np
+from sqlalchemy import Table, Text, any_, bindparam, create_engine, delete, select
+from sqlalchemy.dialects.postgresql import ARRAY, insert
+from sqlalchemy.engine import Engine
 from sqlalchemy.engine.row import LegacyRow
-from sqlalchemy.orm import Load, load_only, sessionmaker
+from sqlalchemy.orm import Load, Query, load_only, sessionmaker
 
 from smartem.data_model import (
     Atlas,
@@ -24,16 +41,262 @@ from smartem.data_model import (
 from smartem.data_model.construct import linear_joins, table_chain
 
 
+def _any_key(column: Any) -> Any:
+    return column == any_(bindparam("keys", type_=ARRAY(Text)))
+
+
+_grid_square_exposure_info_query = (
+    select(
+        (
+            Exposure.exposure_name,
+            FoilHole.foil_hole_name,
+            ExposureInfo.key,
+            ExposureInfo.value,
+        ),
+    )
+    .select_from(
+        ExposureInfo.__table__.join(
+            Exposure.__table__,
+            Exposure.exposure_name == ExposureInfo.exposure_name,
+        ).join(
+            FoilHole.__table__,
+            Exposure.foil_hole_name == FoilHole.foil_hole_name,
+        )
+    )
+    .where(_any_key(ExposureInfo.key))
+    .where(FoilHole.grid_square_name == bindparam("grid_square_name"))
+    .order_by(Exposure.exposure_name)
+)
+
+_grid_square_particle_info_query = (
+    select(
+        (
+            Particle.particle_id,
+            Exposure.exposure_name,
+            FoilHole.foil_hole_name,
+            ParticleInfo.key,
+            ParticleInfo.value,
+        ),
+    )
+    .select_from(
+        ParticleInfo.__table__.join(
+            Particle.__table__,
+            Particle.particle_id == ParticleInfo.particle_id,
+        )
+        .join(
+            Exposure.__table__,
+            Particle.exposure_name == Exposure.exposure_name,
+        )
+        .join(
+            FoilHole.__table__,
+            Exposure.foil_hole_name == FoilHole.foil_hole_name,
+        )
+    )
+    .where(_any_key(ParticleInfo.key))
+    .where(FoilHole.grid_square_name == bindparam("grid_square_name"))
+    .order_by(Particle.particle_id)
+)
+
+_grid_square_particle_set_info_query = (
+    select(
+        (
+            Particle.particle_id,
+            Exposure.exposure_name,
+            FoilHole.foil_hole_name,
+            ParticleSetInfo.key,
+            ParticleSetInfo.value,
+        ),
+    )
+    .select_from(
+        ParticleSetInfo.__table__.join(
+            ParticleSetLinker.__table__,
+            ParticleSetLinker.set_name == ParticleSetInfo.set_name,
+        )
+        .join(
+            Particle.__table__,
+            Particle.particle_id == ParticleSetLinker.particle_id,
+        )
+        .join(
+            Exposure.__table__,
+            Particle.exposure_name == Exposure.exposure_name,
+        )
+        .join(
+            FoilHole.__table__,
+            Exposure.foil_hole_name == FoilHole.foil_hole_name,
+        )
+    )
+    .where(_any_key(ParticleSetInfo.key))
+    .where(FoilHole.grid_square_name == bindparam("grid_square_name"))
+    .order_by(Particle.particle_id)
+)
+
+_atlas_exposure_info_query = (
+    select(
+        (
+            Exposure.exposure_name,
+            FoilHole.foil_hole_name,
+            GridSquare.grid_square_name,
+            ExposureInfo.key,
+            ExposureInfo.value,
+        ),
+    )
+    .select_from(
+        ExposureInfo.__table__.join(
+            Exposure.__table__,
+            Exposure.exposure_name == ExposureInfo.exposure_name,
+        )
+        .join(
+            FoilHole.__table__,
+            Exposure.foil_hole_name == FoilHole.foil_hole_name,
+        )
+        .join(
+            GridSquare.__table__,
+            FoilHole.grid_square_name == GridSquare.grid_square_name,
+        )
+        .join(Tile.__table__, GridSquare.tile_id == Tile.tile_id)
+    )
+    .where(_any_key(ExposureInfo.key))
+    .where(Tile.atlas_id == bindparam("atlas_id"))
+    .order_by(Exposure.exposure_name)
+)
+
+_atlas_particle_info_query = (
+    select(
+        (
+            Particle.particle_id,
+            Exposure.exposure_name,
+            FoilHole.foil_hole_name,
+            GridSquare.grid_square_name,
+            ParticleInfo.key,
+            ParticleInfo.value,
+        ),
+    )
+    .select_from(
+        ParticleInfo.__table__.join(
+            Particle.__table__,
+            Particle.particle_id == ParticleInfo.particle_id,
+        )
+        .join(
+            Exposure.__table__,
+            Particle.exposure_name == Exposure.exposure_name,
+        )
+        .join(
+            FoilHole.__table__,
+            Exposure.foil_hole_name == FoilHole.foil_hole_name,
+        )
+        .join(
+            GridSquare.__table__,
+            FoilHole.grid_square_name == GridSquare.grid_square_name,
+        )
+        .join(Tile.__table__, GridSquare.tile_id == Tile.tile_id)
+    )
+    .where(_any_key(ParticleInfo.key))
+    .where(Tile.atlas_id == bindparam("atlas_id"))
+    .order_by(Particle.particle_id)
+)
+
+_atlas_particle_set_info_query = (
+    select(
+        (
+            Particle.particle_id,
+            Exposure.exposure_name,
+            FoilHole.foil_hole_name,
+            GridSquare.grid_square_name,
+            ParticleSetInfo.key,
+            ParticleSetInfo.value,
+        ),
+    )
+    .select_from(
+        ParticleSetInfo.__table__.join(
+            ParticleSetLinker.__table__,
+            ParticleSetLinker.set_name == ParticleSetInfo.set_name,
+        )
+        .join(
+            Particle.__table__,
+            Particle.particle_id == ParticleSetLinker.particle_id,
+        )
+        .join(
+            Exposure.__table__,
+            Particle.exposure_name == Exposure.exposure_name,
+        )
+        .join(
+            FoilHole.__table__,
+            Exposure.foil_hole_name == FoilHole.foil_hole_name,
+        )
+        .join(
+            GridSquare.__table__,
+            FoilHole.grid_square_name == GridSquare.grid_square_name,
+        )
+        .join(Tile.__table__, GridSquare.tile_id == Tile.tile_id)
+    )
+    .where(_any_key(ParticleSetInfo.key))
+    .where(Tile.atlas_id == bindparam("atlas_id"))
+    .order_by(Particle.particle_id)
+)
+
+
+_engines: Dict[str, Tuple[Engine, sessionmaker]] = {}
+_engines_lock = threading.Lock()
+_query_pool = ThreadPoolExecutor(max_workers=3)
+
+
+def _engine(db_url: str) -> Tuple[Engine, sessionmaker]:
+    with _engines_lock:
+        if db_url not in _engines:
+            engine = create_engine(
+                db_url,
+                executemany_mode="values_plus_batch",
+                executemany_values_page_size=1000,
+                executemany_batch_page_size=500,
+                pool_size=10,
+                max_overflow=20,
+            )
+            _engines[db_url] = (engine, sessionmaker(bind=engine))
+        return _engines[db_url]
+
+
 class DataAPI:
     def __init__(self, project: str = ""):
-        _url = url()
         self._project = project
-        self.engine = create_engine(_url)
-        self.session = sessionmaker(bind=self.engine)()
+        self.engine, session_factory = _engine(url())
+        self.session = session_factory()
+        self._tile_bounds: Dict[int, np.ndarray] = {}
+        self._name_cache_size = 50
+        self._foil_hole_cache: "OrderedDict[str, List[FoilHole]]" = OrderedDict()
+        self._exposure_cache: "OrderedDict[str, List[Exposure]]" = OrderedDict()
+
+    def clear_caches(self):
+        self._clear_caches()
+
+    def _clear_caches(self, table: Optional[Table] = None):
+        if table is None or table is Tile.__table__:
+            self._tile_bounds = {}
+        if table is None or table is FoilHole.__table__:
+            self._foil_hole_cache.clear()
+        if table is None or table is Exposure.__table__:
+            self._exposure_cache.clear()
+
+    def _cached_by_name(
+        self,
+        cache: "OrderedDict[str, list]",
+        name: str,
+        query: Callable[[], list],
+    ) -> list:
+        if name in cache:
+            cache.move_to_end(name)
+            return cache[name]
+        result = query()
+        cache[name] = result
+        if len(cache) > self._name_cache_size:
+            cache.popitem(last=False)
+        return result
 
     def set_project(self, project: str) -> bool:
         self._project = project
-        return project in self.get_projects()
+        query = self.session.query(Project.project_name).filter(
+            Project.project_name == project
+        )
+        return query.first() is not None
 
     def get_project(self, project_name: str = "") -> Project:
         if project_name:
@@ -69,7 +332,7 @@ class DataAPI:
         self.session.commit()
 
     def get_projects(self) -> List[str]:
-        query = self.session.query(Project).options(load_only("project_name"))
+        query = self.session.query(Project.project_name)
         return [q.project_name for q in query.all()]
 
     def get_atlas_from_project(self, project: Project) -> Atlas:
@@ -105,42 +368,76 @@ class DataAPI:
         )
         self.session.commit()
 
+    def _atlas_id(
+        self, atlas_id: Optional[int] = None, project: str = ""
+    ) -> Optional[int]:
+        if atlas_id is not None:
+            return atlas_id
+        if not project:
+            raise ValueError("One of atlas_id or project must be specified")
+        query = self.session.query(Project.atlas_id).filter(
+            Project.project_name == project
+        )
+        row = query.first()
+        return row.atlas_id if row else None
+
+    def _get_tile_bounds(self, atlas_id: int) -> np.ndarray:
+        if atlas_id not in self._tile_bounds:
+            half_width = 0.5 * Tile.pixel_size * Tile.readout_area_x
+            half_height = 0.5 * Tile.pixel_size * Tile.readout_area_y
+            query = select(
+                Tile.tile_id,
+                Tile.stage_position_x - half_width,
+                Tile.stage_position_x + half_width,
+                Tile.stage_position_y + half_height,
+                Tile.stage_position_y - half_height,
+            ).where(Tile.atlas_id == atlas_id)
+            with self.engine.connect() as connection:
+                rows = connection.execute(query).fetchall()
+            self._tile_bounds[atlas_id] = np.array(rows, dtype=float).reshape(-1, 5)
+        return self._tile_bounds[atlas_id]
+
+    def _find_tile_id(
+        self, stage_position: Tuple[float, float], atlas_id: int
+    ) -> Optional[int]:
+        bounds = self._get_tile_bounds(atlas_id)
+        left, right, top, bottom = bounds[:, 1:].T
+        x, y = stage_position
+        (matches,) = np.nonzero((x > left) & (x < right) & (y < top) & (y > bottom))
+        if not matches.size:
+            return None
+        return int(bounds[matches[0], 0])
+
     def get_tile(
         self,
         stage_position: Tuple[float, float],
         atlas_id: Optional[int] = None,
         project: str = "",
     ) -> Optional[Tile]:
-        if atlas_id is None and project:
-            atlas = self.get_atlases(project=project)
-            if not atlas or isinstance(atlas, list):
-                return None
-            atlas_id = atlas.atlas_id
-        else:
-            raise ValueError("One of atlas_id or project must be specified")
-        query = self.session.query(Tile).filter(Tile.atlas_id == atlas_id)
-        tiles = query.all()
-        for tile in tiles:
-            left = tile.stage_position_x - 0.5 * (tile.pixel_size * tile.readout_area_x)
-            right = tile.stage_position_x + 0.5 * (
-                tile.pixel_size * tile.readout_area_x
-            )
-            top = tile.stage_position_y + 0.5 * (tile.pixel_size * tile.readout_area_y)
-            bottom = tile.stage_position_y - 0.5 * (
-                tile.pixel_size * tile.readout_area_y
-            )
-            if stage_position[0] > left and stage_position[0] < right:
-                if stage_position[1] < top and stage_position[1] > bottom:
-                    return tile
-        return None
+        atlas_id = self._atlas_id(atlas_id=atlas_id, project=project)
+        if atlas_id is None:
+            return None
+        half_width = 0.5 * Tile.pixel_size * Tile.readout_area_x
+        half_height = 0.5 * Tile.pixel_size * Tile.readout_area_y
+        query = self.session.query(Tile).filter(
+            Tile.atlas_id == atlas_id,
+            Tile.stage_position_x - half_width < stage_position[0],
+            Tile.stage_position_x + half_width > stage_position[0],
+            Tile.stage_position_y + half_height > stage_position[1],
+            Tile.stage_position_y - half_height < stage_position[1],
+        )
+        return query.first()
 
     def get_tile_id(
         self, stage_position: Tuple[float, float], project: str
     ) -> Optional[int]:
-        tile = self.get_tile(stage_position, project=project)
-        if tile:
-            return tile.tile_id
-        return None
+        atlas_id = self._atlas_id(project=project)
+        if atlas_id is None:
+            return None
+        return self._find_tile_id(stage_position, atlas_id)
+
+    def _stream(self, query: Query, batch_size: int = 10000) -> Iterator[Any]:
+        return query.execution_options(stream_results=True).yield_per(batch_size)
 
     def get_grid_squares(
         self,
@@ -201,6 +498,10 @@ class DataAPI:
                 query = linear_joins(
                     self.session, tables, primary_filter=primary_filter
                 )
+            if grid_square_name and not project:
+                return self._cached_by_name(
+                    self._foil_hole_cache, grid_square_name, query.all
+                )
             if len(tables) == 1:
                 return query.all()
             return [q[0] for q in query.all()]
@@ -239,11 +540,37 @@ class DataAPI:
                 query = linear_joins(
                     self.session, tables, primary_filter=primary_filter
                 )
+            if foil_hole_name and not project:
+                return self._cached_by_name(
+                    self._exposure_cache, foil_hole_name, query.all
+                )
             if len(tables) == 1:
                 return query.all()
             return [q[0] for q in query.all()]
         return []
 
+    def _group_by_name(
+        self, table: Type[Base], column: Any, names: Sequence[str]
+    ) -> Dict[str, list]:
+        grouped: Dict[str, list] = {name: [] for name in names}
+        if grouped:
+            query = self.session.query(table).filter(column.in_(list(grouped)))
+            for row in query.all():
+                grouped[getattr(row, column.key)].append(row)
+        return grouped
+
+    def get_foil_holes_many(
+        self, grid_square_names: Sequence[str]
+    ) -> Dict[str, List[FoilHole]]:
+        return self._group_by_name(
+            FoilHole, FoilHole.grid_square_name, grid_square_names
+        )
+
+    def get_exposures_many(
+        self, foil_hole_names: Sequence[str]
+    ) -> Dict[str, List[Exposure]]:
+        return self._group_by_name(Exposure, Exposure.foil_hole_name, foil_hole_names)
+
     def get_particles(
         self,
         project: str = "",
@@ -254,9 +581,7 @@ class DataAPI:
         exposure_name: str = "",
         source: str = "",
     ) -> List[Particle]:
-        res = []
-        particle_batch_size = 500000
-        if any(
+        if not any(
             (
                 project,
                 atlas_id,
@@ -267,88 +592,56 @@ class DataAPI:
                 source,
             )
         ):
-            if source:
-                if not project:
-                    raise ValueError(
-                        "If source is provided then project must also be provided"
-                    )
-                tables = [Particle, ParticleSet, ParticleSetLinker]
-                query = linear_joins(self.session, tables)
-                query = (
-                    query.join(
-                        Particle, Particle.particle_id == ParticleSetLinker.particle_id
-                    )
-                    .join(
-                        ParticleSetLinker,
-                        ParticleSetLinker.set_name == ParticleSet.identifier,
-                    )
-                    .filter(ParticleSet.project_name == project)
+            return []
+        if source:
+            if not project:
+                raise ValueError(
+                    "If source is provided then project must also be provided"
+                )
+            tables = [Particle, ParticleSet, ParticleSetLinker]
+            query = linear_joins(self.session, tables)
+            query = (
+                query.join(
+                    Particle, Particle.particle_id == ParticleSetLinker.particle_id
+                )
+                .join(
+                    ParticleSetLinker,
+                    ParticleSetLinker.set_name == ParticleSet.identifier,
+                )
+                .filter(ParticleSet.project_name == project)
+            )
+        else:
+            primary_filter: Any = None
+            end: Type[Base] = Tile
+            if exposure_name:
+                end = Particle
+                primary_filter = exposure_name
+            elif foil_hole_name:
+                end = Exposure
+                primary_filter = foil_hole_name
+            elif grid_square_name:
+                end = FoilHole
+                primary_filter = grid_square_name
+            elif tile_id is not None:
+                end = GridSquare
+                primary_filter = tile_id
+            elif atlas_id is not None:
+                primary_filter = atlas_id
+            tables = table_chain(Particle, end)
+            if project:
+                tables.append(Project)
+                query = linear_joins(self.session, tables, skip=[Project])
+                query = query.join(Project, Project.atlas_id == Tile.atlas_id).filter(
+                    Project.project_name == project
                 )
-                particle_count = query.count()
-                num_full_batches = particle_count // particle_batch_size
-                for b in range(num_full_batches + 1):
-                    if len(tables) == 1:
-                        res.extend(
-                            query.limit(particle_batch_size)
-                            .offset(b * particle_batch_size)
-                            .all()
-                        )
-                    else:
-                        res.extend(
-                            q[0]
-                            for q in query.order_by(Particle.particle_id)
-                            .limit(particle_batch_size)
-                            .offset(b * particle_batch_size)
-                            .all()
-                        )
             else:
-                primary_filter: Any = None
-                end: Type[Base] = Tile
-                if exposure_name:
-                    end = Particle
-                    primary_filter = exposure_name
-                elif foil_hole_name:
-                    end = Exposure
-                    primary_filter = foil_hole_name
-                elif grid_square_name:
-                    end = FoilHole
-                    primary_filter = grid_square_name
-                elif tile_id is not None:
-                    end = GridSquare
-                    primary_filter = tile_id
-                elif atlas_id is not None:
-                    primary_filter = atlas_id
-                tables = table_chain(Particle, end)
-                if project:
-                    tables.append(Project)
-                    query = linear_joins(self.session, tables, skip=[Project])
-                    query = query.join(
-                        Project, Project.atlas_id == Tile.atlas_id
-                    ).filter(Project.project_name == project)
-                else:
-                    query = linear_joins(
-                        self.session, tables, primary_filter=primary_filter
-                    )
-                particle_count = query.count()
-                num_full_batches = particle_count // particle_batch_size
-                for b in range(num_full_batches + 1):
-                    if len(tables) == 1:
-                        res.extend(
-                            query.order_by(Particle.particle_id)
-                            .limit(particle_batch_size)
-                            .offset(b * particle_batch_size)
-                            .all()
-                        )
-                    else:
-                        res.extend(
-                            q[0]
-                            for q in query.order_by(Particle.particle_id)
-                            .limit(particle_batch_size)
-                            .offset(b * particle_batch_size)
-                            .all()
-                        )
-            return res
-        return []
+                query = linear_joins(
+                    self.session, tables, primary_filter=primary_filter
+                )
+        rows = self._stream(query.order_by(Particle.particle_id))
+        if len(tables) == 1:
+            return list(rows)
+        return [q[0] for q in rows]
 
     def get_particle_sets(
         self,
@@ -366,9 +659,8 @@ class DataAPI:
                 self.session.query(ParticleSet)
                 .filter(ParticleSet.project_name == project)
                 .filter(ParticleSet.group_name == group_name)
-                .filter(
-                    ParticleSet.identifier.in_([f"{source_name}:{s}" for s in set_ids])
-                )
+                .filter(ParticleSet.identifier.in_(bindparam("ids", expanding=True)))
+                .params(ids=[f"{source_name}:{s}" for s in set_ids])
             )
         else:
             raise ValueError(
@@ -380,82 +672,65 @@ class DataAPI:
     def get_particle_linkers(
         self, project: str, set_ids: Union[Set[str], List[str]], source_name: str
     ) -> List[ParticleSetLinker]:
-        res: List[ParticleSetLinker] = []
-        particle_batch_size = 500000
         query = (
             self.session.query(ParticleSetLinker, ParticleSet)
             .join(ParticleSet, ParticleSet.identifier == ParticleSetLinker.set_name)
             .filter(ParticleSet.project_name == project)
-            .filter(
-                ParticleSetLinker.set_name.in_([f"{source_name}:{s}" for s in set_ids])
-            )
+            .filter(ParticleSetLinker.set_name.in_(bindparam("ids", expanding=True)))
+            .params(ids=[f"{source_name}:{s}" for s in set_ids])
         )
-        particle_count = query.count()
-        num_full_batches = particle_count // particle_batch_size
-        for b in range(num_full_batches + 1):
-            res.extend(
-                q[0]
-                for q in query.order_by(ParticleSetLinker.particle_id)
-                .limit(particle_batch_size)
-                .offset(b * particle_batch_size)
-                .all()
-            )
-        return res
+        return [
+            q[0] for q in self._stream(query.order_by(ParticleSetLinker.particle_id))
+        ]
 
     def get_exposure_keys(self, project: str) -> List[str]:
         query = (
-            self.session.query(
-                Project, Tile, GridSquare, FoilHole, Exposure, ExposureInfo
-            )
-            .options(Load(Tile).load_only("tile_id", "atlas_id"), Load(FoilHole).load_only("grid_square_name", "foil_hole_name"), Load(Exposure).load_only("foil_hole_name", "exposure_name"), Load(ExposureInfo).load_only("key"))  # type: ignore
-            .join(Project, Project.atlas_id == Tile.atlas_id)
+            self.session.query(ExposureInfo.key)
+            .select_from(Project)
+            .join(Tile, Tile.atlas_id == Project.atlas_id)
             .join(GridSquare, GridSquare.tile_id == Tile.tile_id)
             .join(FoilHole, FoilHole.grid_square_name == GridSquare.grid_square_name)
             .join(Exposure, Exposure.foil_hole_name == FoilHole.foil_hole_name)
             .join(ExposureInfo, ExposureInfo.exposure_name == Exposure.exposure_name)
             .filter(Project.project_name == project)
-            .distinct(ExposureInfo.key)
+            .distinct()
         )
-        return [q[-1].key for q in query.all()]
+        return [q.key for q in query.all()]
 
     def get_particle_keys(self, project: str) -> List[str]:
         query = (
-            self.session.query(
-                Project, Tile, GridSquare, FoilHole, Exposure, Particle, ParticleInfo
-            )
-            .options(Load(Tile).load_only("tile_id", "atlas_id"), Load(FoilHole).load_only("grid_square_name", "foil_hole_name"), Load(Exposure).load_only("foil_hole_name", "exposure_name"), Load(Particle).load_only("exposure_name", "particle_id"), Load(ParticleInfo).load_only("key"))  # type: ignore
-            .join(Project, Project.atlas_id == Tile.atlas_id)
+            self.session.query(ParticleInfo.key)
+            .select_from(Project)
+            .join(Tile, Tile.atlas_id == Project.atlas_id)
             .join(GridSquare, GridSquare.tile_id == Tile.tile_id)
             .join(FoilHole, FoilHole.grid_square_name == GridSquare.grid_square_name)
             .join(Exposure, Exposure.foil_hole_name == FoilHole.foil_hole_name)
             .join(Particle, Particle.exposure_name == Exposure.exposure_name)
             .join(ParticleInfo, ParticleInfo.particle_id == Particle.particle_id)
             .filter(Project.project_name == project)
-            .distinct(ParticleInfo.key)
+            .distinct()
         )
-        return [q[-1].key for q in query.all()]
+        return [q.key for q in query.all()]
 
     def get_particle_set_keys(self, project: str) -> List[str]:
         query = (
-            self.session.query(ParticleSet, ParticleSetInfo)
-            .options(Load(ParticleSet).load_only("project_name", "identifier"), Load(ParticleSetInfo).load_only("key"))  # type: ignore
+            self.session.query(ParticleSetInfo.key)
             .join(ParticleSet, ParticleSet.identifier == ParticleSetInfo.set_name)
             .filter(ParticleSet.project_name == project)
-            .distinct(ParticleSetInfo.key)
+            .distinct()
         )
-        return [q[-1].key for q in query.all()]
+        return [q.key for q in query.all()]
 
     def get_particle_set_group_names(self, project: str) -> List[str]:
         query = (
-            self.session.query(ParticleSet, Project)
-            .join(Project, Project.project_name == ParticleSet.project_name)
-            .filter(Project.project_name == project)
-            .distinct(ParticleSet.group_name)
+            self.session.query(ParticleSet.group_name)
+            .filter(ParticleSet.project_name == project)
+            .distinct()
         )
-        return [q[0].group_name for q in query.all()]
+        return [q.group_name for q in query.all()]
 
     def get_particle_id(self, exposure_name: str, x: float, y: float) -> Optional[int]:
-        query = self.session.query(Particle).filter(
+        query = self.session.query(Particle.particle_id).filter(
             Particle.exposure_name == exposure_name, Particle.x == x, Particle.y == y
         )
         _particle = query.all()
@@ -465,31 +740,22 @@ class DataAPI:
             raise ValueError(
                 f"More than one particle found for exposure [{exposure_name}], x [{x}], y [{y}]"
             )
-        particle = _particle[0]
-        return particle.particle_id
+        return _particle[0].particle_id
 
     def get_particle_info_sources(self, project: str) -> List[str]:
         query = (
-            self.session.query(
-                Project,
-                Tile,
-                GridSquare,
-                FoilHole,
-                Exposure,
-                Particle,
-                ParticleInfo,
-            )
-            .options(Load(Tile).load_only("tile_id", "atlas_id"), Load(FoilHole).load_only("grid_square_name", "foil_hole_name"), Load(Exposure).load_only("foil_hole_name", "exposure_name"), Load(Particle).load_only("exposure_name", "particle_id"), Load(ParticleInfo).load_only("source"))  # type: ignore
+            self.session.query(ParticleInfo.source)
+            .select_from(Project)
+            .join(Tile, Tile.atlas_id == Project.atlas_id)
             .join(GridSquare, GridSquare.tile_id == Tile.tile_id)
             .join(FoilHole, FoilHole.grid_square_name == GridSquare.grid_square_name)
             .join(Exposure, Exposure.foil_hole_name == FoilHole.foil_hole_name)
             .join(Particle, Particle.exposure_name == Exposure.exposure_name)
             .join(ParticleInfo, ParticleInfo.particle_id == Particle.particle_id)
-            .join(Project, Project.atlas_id == Tile.atlas_id)
             .filter(Project.project_name == project)
-            .distinct(ParticleInfo.source)
+            .distinct()
         )
-        return [q[-1].source for q in query.all()]
+        return [q.source for q in query.all()]
 
     def get_exposure_info(
         self,
@@ -502,25 +768,31 @@ class DataAPI:
             return info
         particle_query = (
             self.session.query(ParticleInfo, Particle)
+            .select_from(Particle)
+            .options(Load(Particle).load_only("particle_id"))  # type: ignore
             .join(ParticleInfo, ParticleInfo.particle_id == Particle.particle_id)
-            .filter(ParticleInfo.key.in_(particle_keys))
+            .filter(_any_key(ParticleInfo.key))
             .filter(Particle.exposure_name == exposure_name)
             .order_by(Particle.particle_id)
         )
         particle_set_query = (
             self.session.query(ParticleSetInfo, ParticleSetLinker, Particle)
+            .select_from(Particle)
+            .options(Load(Particle).load_only("particle_id"))  # type: ignore
             .join(
                 ParticleSetLinker, ParticleSetLinker.particle_id == Particle.particle_id
             )
             .join(
                 ParticleSetInfo, ParticleSetInfo.set_name == ParticleSetLinker.set_name
             )
-            .filter(ParticleSetInfo.key.in_(particle_set_keys))
+            .filter(_any_key(ParticleSetInfo.key))
             .filter(Particle.exposure_name == exposure_name)
             .order_by(Particle.particle_id)
         )
-        info.extend(particle_query.all())
-        info.extend(particle_set_query.all())
+        if particle_keys:
+            info.extend(particle_query.params(keys=particle_keys).all())
+        if particle_set_keys:
+            info.extend(particle_set_query.params(keys=particle_set_keys).all())
         return info
 
     def get_foil_hole_info(
@@ -535,20 +807,26 @@ class DataAPI:
             return info
         exposure_query = (
             self.session.query(ExposureInfo, Exposure)
+            .select_from(ExposureInfo)
+            .options(Load(Exposure).load_only("exposure_name"))  # type: ignore
             .join(Exposure, Exposure.exposure_name == ExposureInfo.exposure_name)
-            .filter(ExposureInfo.key.in_(exposure_keys))
+            .filter(_any_key(ExposureInfo.key))
             .filter(Exposure.foil_hole_name == foil_hole_name)
         )
         particle_query = (
             self.session.query(ParticleInfo, Particle, Exposure)
+            .select_from(Particle)
+            .options(Load(Particle).load_only("particle_id"), Load(Exposure).load_only("exposure_name"))  # type: ignore
             .join(Exposure, Exposure.exposure_name == Particle.exposure_name)
             .join(ParticleInfo, ParticleInfo.particle_id == Particle.particle_id)
-            .filter(ParticleInfo.key.in_(particle_keys))
+            .filter(_any_key(ParticleInfo.key))
             .filter(Exposure.foil_hole_name == foil_hole_name)
             .order_by(Particle.particle_id)
         )
         particle_set_query = (
             self.session.query(ParticleSetInfo, ParticleSetLinker, Particle, Exposure)
+            .select_from(Particle)
+            .options(Load(Particle).load_only("particle_id"), Load(Exposure).load_only("exposure_name"))  # type: ignore
             .join(Exposure, Exposure.exposure_name == Particle.exposure_name)
             .join(
                 ParticleSetLinker, ParticleSetLinker.particle_id == Particle.particle_id
@@ -556,13 +834,16 @@ class DataAPI:
             .join(
                 ParticleSetInfo, ParticleSetInfo.set_name == ParticleSetLinker.set_name
             )
-            .filter(ParticleSetInfo.key.in_(particle_set_keys))
+            .filter(_any_key(ParticleSetInfo.key))
             .filter(Exposure.foil_hole_name == foil_hole_name)
             .order_by(Particle.particle_id)
         )
-        info.extend(exposure_query.all())
-        info.extend(particle_query.all())
-        info.extend(particle_set_query.all())
+        if exposure_keys:
+            info.extend(exposure_query.params(keys=exposure_keys).all())
+        if particle_keys:
+            info.extend(particle_query.params(keys=particle_keys).all())
+        if particle_set_keys:
+            info.extend(particle_set_query.params(keys=particle_set_keys).all())
         return info
 
     def get_grid_square_info(
@@ -572,111 +853,36 @@ class DataAPI:
         particle_keys: List[str],
         particle_set_keys: List[str],
     ) -> List[LegacyRow]:
-        info: List[tuple] = []
         if not any((exposure_keys, particle_keys, particle_set_keys)):
-            return info
-        exposure_query = (
-            select(
-                (
-                    Exposure.exposure_name,
-                    FoilHole.foil_hole_name,
-                    ExposureInfo.key,
-                    ExposureInfo.value,
-                ),
-            )
-            .select_from(
-                ExposureInfo.__table__.join(
-                    Exposure.__table__,
-                    Exposure.exposure_name == ExposureInfo.exposure_name,
-                ).join(
-                    FoilHole.__table__,
-                    Exposure.foil_hole_name == FoilHole.foil_hole_name,
-                )
-            )
-            .where(
-                ExposureInfo.key.in_(exposure_keys),
-            )
-            .where(FoilHole.grid_square_name == grid_square_name)
-            .order_by(Exposure.exposure_name)
-        )
-        with self.engine.connect() as connection:
-            info.extend(connection.execute(exposure_query).fetchall())
-
-        if particle_keys:
-            particle_query = (
-                select(
-                    (
-                        Particle.particle_id,
-                        Particle.x,
-                        Particle.y,
-                        Exposure.exposure_name,
-                        FoilHole.foil_hole_name,
-                        ParticleInfo.key,
-                        ParticleInfo.value,
-                    ),
-                )
-                .select_from(
-                    ParticleInfo.__table__.join(
-                        Particle.__table__,
-                        Particle.particle_id == ParticleInfo.particle_id,
-                    )
-                    .join(
-                        Exposure.__table__,
-                        Particle.exposure_name == Exposure.exposure_name,
-                    )
-                    .join(
-                        FoilHole.__table__,
-                        Exposure.foil_hole_name == FoilHole.foil_hole_name,
-                    )
-                )
-                .where(
-                    ParticleInfo.key.in_(particle_keys),
-                )
-                .where(FoilHole.grid_square_name == grid_square_name)
-                .order_by(Particle.particle_id)
+            return []
+        queries = [
+            (query, keys)
+            for query, keys in (
+                (_grid_square_exposure_info_query, exposure_keys),
+                (_grid_square_particle_info_query, particle_keys),
+                (_grid_square_particle_set_info_query, particle_set_keys),
             )
-            with self.engine.connect() as connection:
-                info.extend(connection.execute(particle_query).fetchall())
-
-        if particle_set_keys:
-            particle_set_query = (
-                select(
-                    (
-                        Particle.particle_id,
-                        Particle.x,
-                        Particle.y,
-                        Exposure.exposure_name,
-                        FoilHole.foil_hole_name,
-                        ParticleSetInfo.key,
-                        ParticleSetInfo.value,
-                    ),
-                )
-                .select_from(
-                    ParticleSetInfo.__table__.join(
-                        ParticleSetLinker.__table__,
-                        ParticleSetLinker.set_name == ParticleSetInfo.set_name,
-                    )
-                    .join(
-                        Particle.__table__,
-                        Particle.particle_id == ParticleSetLinker.particle_id,
-                    )
-                    .join(
-                        Exposure.__table__,
-                        Particle.exposure_name == Exposure.exposure_name,
-                    )
-                    .join(
-                        FoilHole.__table__,
-                        Exposure.foil_hole_name == FoilHole.foil_hole_name,
-                    )
-                )
-                .where(ParticleSetInfo.key.in_(particle_set_keys))
-                .where(FoilHole.grid_square_name == grid_square_name)
-                .order_by(Particle.particle_id)
+            if keys
+        ]
+        if len(queries) == 1:
+            return self._fetch_info(*queries[0], {"grid_square_name": grid_square_name})
+        futures = [
+            _query_pool.submit(
+                self._fetch_info, query, keys, {"grid_square_name": grid_square_name}
             )
-            with self.engine.connect() as connection:
-                info.extend(connection.execute(particle_set_query).fetchall())
+            for query, keys in queries
+        ]
+        info: List[LegacyRow] = []
+        for f in futures:
+            info.extend(f.result())
         return info
 
+    def _fetch_info(
+        self, query: Any, keys: List[str], params: Dict[str, Any]
+    ) -> List[LegacyRow]:
+        with self.engine.connect() as connection:
+            return connection.execute(query, {"keys": keys, **params}).fetchall()
+
     def get_atlas_info(
         self,
         atlas_id: int,
@@ -684,148 +890,64 @@ class DataAPI:
         particle_keys: List[str],
         particle_set_keys: List[str],
     ) -> List[LegacyRow]:
-        info: List[tuple] = []
-        if not any((exposure_keys, particle_keys, particle_set_keys)):
-            return info
-        exposure_query = (
-            select(
-                (
-                    Exposure.exposure_name,
-                    FoilHole.foil_hole_name,
-                    GridSquare.grid_square_name,
-                    ExposureInfo.key,
-                    ExposureInfo.value,
-                ),
+        return list(
+            self.iter_atlas_info(
+                atlas_id, exposure_keys, particle_keys, particle_set_keys
             )
-            .select_from(
-                ExposureInfo.__table__.join(
-                    Exposure.__table__,
-                    Exposure.exposure_name == ExposureInfo.exposure_name,
-                )
-                .join(
-                    FoilHole.__table__,
-                    Exposure.foil_hole_name == FoilHole.foil_hole_name,
-                )
-                .join(
-                    GridSquare.__table__,
-                    FoilHole.grid_square_name == GridSquare.grid_square_name,
-                )
-                .join(Tile.__table__, GridSquare.tile_id == Tile.tile_id)
-            )
-            .where(ExposureInfo.key.in_(exposure_keys))
-            .where(Tile.atlas_id == atlas_id)
-            .order_by(Exposure.exposure_name)
         )
-        with self.engine.connect() as connection:
-            info.extend(connection.execute(exposure_query).fetchall())
-
-        if particle_keys:
-            particle_query = (
-                select(
-                    (
-                        Particle.particle_id,
-                        Particle.x,
-                        Particle.y,
-                        Exposure.exposure_name,
-                        FoilHole.foil_hole_name,
-                        GridSquare.grid_square_name,
-                        ParticleInfo.key,
-                        ParticleInfo.value,
-                    ),
-                )
-                .select_from(
-                    ParticleInfo.__table__.join(
-                        Particle.__table__,
-                        Particle.particle_id == ParticleInfo.particle_id,
-                    )
-                    .join(
-                        Exposure.__table__,
-                        Particle.exposure_name == Exposure.exposure_name,
-                    )
-                    .join(
-                        FoilHole.__table__,
-                        Exposure.foil_hole_name == FoilHole.foil_hole_name,
-                    )
-                    .join(
-                        GridSquare.__table__,
-                        FoilHole.grid_square_name == GridSquare.grid_square_name,
-                    )
-                    .join(Tile.__table__, GridSquare.tile_id == Tile.tile_id)
-                )
-                .where(ParticleInfo.key.in_(particle_keys))
-                .where(Tile.atlas_id == atlas_id)
-                .order_by(Particle.particle_id)
-            )
-            with self.engine.connect() as connection:
-                info.extend(connection.execute(particle_query).fetchall())
 
-        if particle_set_keys:
-            particle_set_query = (
-                select(
-                    (
-                        Particle.particle_id,
-                        Particle.x,
-                        Particle.y,
-                        Exposure.exposure_name,
-                        FoilHole.foil_hole_name,
-                        GridSquare.grid_square_name,
-                        ParticleSetInfo.key,
-                        ParticleSetInfo.value,
-                    ),
-                )
-                .select_from(
-                    ParticleSetInfo.__table__.join(
-                        ParticleSetLinker.__table__,
-                        ParticleSetLinker.set_name == ParticleSetInfo.set_name,
-                    )
-                    .join(
-                        Particle.__table__,
-                        Particle.particle_id == ParticleSetLinker.particle_id,
-                    )
-                    .join(
-                        Exposure.__table__,
-                        Particle.exposure_name == Exposure.exposure_name,
-                    )
-                    .join(
-                        FoilHole.__table__,
-                        Exposure.foil_hole_name == FoilHole.foil_hole_name,
-                    )
-                    .join(
-                        GridSquare.__table__,
-                        FoilHole.grid_square_name == GridSquare.grid_square_name,
-                    )
-                    .join(Tile.__table__, GridSquare.tile_id == Tile.tile_id)
-                )
-                .where(
-                    ParticleSetInfo.key.in_(particle_set_keys),
-                )
-                .where(Tile.atlas_id == atlas_id)
-                .order_by(Particle.particle_id)
-            )
-            with self.engine.connect() as connection:
-                result = connection.execute(particle_set_query).fetchall()
-                info.extend(result)
-        return info
-
-    def put(self, entries: Sequence[Base], allow_duplicates: bool = True) -> list:
+    def iter_atlas_info(
+        self,
+        atlas_id: int,
+        exposure_keys: List[str],
+        particle_keys: List[str],
+        particle_set_keys: List[str],
+        chunk_size: int = 100_000,
+    ) -> Iterator[LegacyRow]:
+        if not any((exposure_keys, particle_keys, particle_set_keys)):
+            return
+        with self.engine.connect() as connection:
+            connection = connection.execution_options(stream_results=True)
+            for query, keys in (
+                (_atlas_exposure_info_query, exposure_keys),
+                (_atlas_particle_info_query, particle_keys),
+                (_atlas_particle_set_info_query, particle_set_keys),
+            ):
+                if not keys:
+                    continue
+                result = connection.execute(query, {"keys": keys, "atlas_id": atlas_id})
+                for partition in result.partitions(chunk_size):
+                    yield from partition
+
+    def put(
+        self,
+        entries: Sequence[Base],
+        allow_duplicates: bool = True,
+        page_size: int = 1000,
+    ) -> list:
         if not entries:
             return []
         table = entries[0].__table__  # type: ignore
+        self._clear_caches(table)
         rows = [
             {k: v for k, v in e.__dict__.items() if k != "_sa_instance_state"}
             for e in entries
         ]
+        insert_stmt = insert(table)
+        if allow_duplicates:
+            insert_stmt = insert_stmt.returning(
+                table.primary_key.columns.values()[0]
+            ).on_conflict_do_update(constraint=table.primary_key, set_=table.columns)
+        inserted = []
         with self.engine.connect() as connection:
             with connection.begin():
-                insert_stmt = insert(table).values(rows)
-                if allow_duplicates:
-                    insert_stmt = insert_stmt.returning(
-                        table.primary_key.columns.values()[0]
-                    ).on_conflict_do_update(
-                        constraint=table.primary_key, set_=table.columns
+                for i in range(0, len(rows), page_size):
+                    result = connection.execute(
+                        insert_stmt.values(rows[i : i + page_size])
                     )
-                result = connection.execute(insert_stmt)
-        return result.fetchall()
+                    if allow_duplicates:
+                        inserted.extend(result.fetchall())
+        return inserted
 
     def delete_project(self, project: str):
         stmts = []
@@ -894,3 +1016,4 @@ class DataAPI:
             with connection.begin():
                 for st in stmts:
                     connection.execute(st)
+        self._clear_caches()
@@ -1,14 +1,36 @@
 import math
-from typing import Dict, List, NamedTuple, Optional, Tuple, Union
+import sys
+from itertools import islice
+from operator import attrgetter
+from typing import (
+    Any,
+    Callable,
+    Dict,
+    Iterable,
+    Iterator,
+    List,
+    NamedTuple,
+    Optional,
+    Tuple,
+    Union,
+)
 
 import numpy as np
 from sqlalchemy.engine.row import LegacyRow
 
 from smartem.data_model import Base, Exposure, FoilHole, Particle
 
+_key_value = attrgetter("key", "value")
+_particle_id = attrgetter("particle_id")
+_exposure_name = attrgetter("exposure_name")
+_foil_hole_name = attrgetter("foil_hole_name")
+_grid_square_name = attrgetter("grid_square_name")
+
+_CHUNK_SIZE = 100_000
+
 
 class ExtractedData(NamedTuple):
-    flattened_data: List[float]
+    flattened_data: np.ndarray
     averages: Optional[Dict[str, float]] = None
     counts: Optional[Dict[str, int]] = None
 
@@ -40,161 +62,222 @@ def _foil_hole_tab_index(tables: Tuple[Base], default: int = -1) -> int:
     return fhti
 
 
+def _tab_indices(
+    sr: tuple, cache: Dict[Tuple[int, type], Tuple[int, int]]
+) -> Tuple[int, int]:
+    layout = (len(sr), type(sr[0]))
+    if layout not in cache:
+        cache[layout] = (_particle_tab_index(sr), _exposure_tab_index(sr))
+    return cache[layout]
+
+
+def _chunks(rows: Iterable[Any], size: int = _CHUNK_SIZE) -> Iterator[List[Any]]:
+    it = iter(rows)
+    chunk = list(islice(it, size))
+    while chunk:
+        yield chunk
+        chunk = list(islice(it, size))
+
+
+class _Scatter:
+    def __init__(self, n_keys: int, accumulate: bool = False):
+        self._accumulate = accumulate
+        self._size = 0
+        self._values = np.zeros((n_keys, 0))
+        self._counts = np.zeros((n_keys, 0), dtype=np.int64)
+        self._used = np.zeros((n_keys, 0), dtype=bool)
+
+    @property
+    def values(self) -> np.ndarray:
+        return self._values[:, : self._size]
+
+    @property
+    def counts(self) -> np.ndarray:
+        return self._counts[:, : self._size]
+
+    @property
+    def used(self) -> np.ndarray:
+        return self._used[:, : self._size]
+
+    def _grow(self, size: int):
+        self._size = max(self._size, size)
+        n_keys, capacity = self._used.shape
+        if size <= capacity:
+            return
+        capacity = max(size, 2 * capacity)
+        used = np.zeros((n_keys, capacity), dtype=bool)
+        used[:, : self._used.shape[1]] = self._used
+        self._used = used
+        values = np.zeros((n_keys, capacity))
+        values[:, : self._values.shape[1]] = self._values
+        self._values = values
+        if self._accumulate:
+            counts = np.zeros((n_keys, capacity), dtype=np.int64)
+            counts[:, : self._counts.shape[1]] = self._counts
+            self._counts = counts
+
+    def add(
+        self,
+        key_list: List[int],
+        index_list: List[int],
+        value_list: List[float],
+        size: int,
+    ):
+        self._grow(size)
+        capacity = self._used.shape[1]
+        flat_indices = np.array(key_list, dtype=np.intp) * capacity + np.array(
+            index_list, dtype=np.intp
+        )
+        values = np.array(value_list, dtype=float)
+        self._used.flat[flat_indices] = True
+        if self._accumulate:
+            # sum only over the cells touched by this chunk
+            cells, inverse = np.unique(flat_indices, return_inverse=True)
+            self._values.flat[cells] += np.bincount(
+                inverse, weights=values, minlength=cells.size
+            )
+            self._counts.flat[cells] += np.bincount(inverse, minlength=cells.size)
+            return
+        # keep the last value seen for each cell, as sequential assignment would
+        last = (
+            flat_indices.size - 1 - np.unique(flat_indices[::-1], return_index=True)[1]
+        )
+        self._values.flat[flat_indices[last]] = values[last]
+
+    def complete(self, key_to_idx: Dict[str, int]) -> Dict[str, np.ndarray]:
+        mask = self.used.all(axis=0)
+        selected = self.values[:, mask]
+        if self._accumulate:
+            selected = selected / self.counts[:, mask]
+        return {key: selected[ki] for key, ki in key_to_idx.items()}
+
+    def group_averages(
+        self, keys: List[str], key_to_idx: Dict[str, int], group_indices: Dict[str, int]
+    ) -> Tuple[Dict[str, Dict[str, float]], Dict[str, Dict[str, int]]]:
+        group_names: List[str] = [""] * len(group_indices)
+        for g, gi in group_indices.items():
+            group_names[gi] = g
+        means = self.values / np.maximum(self.counts, 1)
+        averages = {}
+        group_counts = {}
+        for k in keys:
+            ki = key_to_idx[k]
+            present = np.flatnonzero(self.counts[ki])
+            names = [group_names[gi] for gi in present]
+            averages[k] = dict(zip(names, means[ki, present].tolist()))
+            group_counts[k] = dict(zip(names, self.counts[ki, present].tolist()))
+        return averages, group_counts
+
+
+def _extract_entities(
+    sql_result: Iterable[tuple],
+    keys: List[str],
+    entity_tab: int,
+    entity_getter: Callable[[Base], Union[int, str]],
+    accumulate: bool,
+) -> Dict[str, np.ndarray]:
+    tab_indices: Dict[Tuple[int, type], Tuple[int, int]] = {}
+    key_to_idx = {sys.intern(k): i for i, k in enumerate(keys)}
+    indices: Dict[Union[int, str], int] = {}
+    scatter = _Scatter(len(keys), accumulate=accumulate)
+    for chunk in _chunks(sql_result):
+        key_list: List[int] = []
+        index_list: List[int] = []
+        value_list: List[float] = []
+        for sr in chunk:
+            key, value = _key_value(sr[0])
+            if math.isinf(value):
+                continue
+            entity = entity_getter(sr[_tab_indices(sr, tab_indices)[entity_tab]])
+            key_list.append(key_to_idx[key])
+            index_list.append(indices.setdefault(entity, len(indices)))
+            value_list.append(value)
+        scatter.add(key_list, index_list, value_list, len(indices))
+    return scatter.complete(key_to_idx)
+
+
+def _extract_particles(
+    sql_result: Iterable[tuple], keys: List[str]
+) -> Dict[str, np.ndarray]:
+    return _extract_entities(sql_result, keys, 0, _particle_id, False)
+
+
+def _extract_exposure_avg(
+    sql_result: Iterable[tuple], keys: List[str]
+) -> Dict[str, np.ndarray]:
+    return _extract_entities(sql_result, keys, 1, _exposure_name, True)
+
+
+def _extract_exposure_direct(
+    sql_result: Iterable[tuple], keys: List[str]
+) -> Dict[str, np.ndarray]:
+    return _extract_entities(sql_result, keys, 1, _exposure_name, False)
+
+
 def extract_keys(
-    sql_result: list,
+    sql_result: Iterable[tuple],
     exposure_keys: List[str],
     particle_keys: List[str],
     particle_set_keys: List[str],
-) -> Dict[str, List[float]]:
-    particles = {sr[_particle_tab_index(sr)] for sr in sql_result}
-    exposures = {sr[_exposure_tab_index(sr)] for sr in sql_result}
+) -> Dict[str, np.ndarray]:
     keys = exposure_keys + particle_keys + particle_set_keys
-    avg_particles = bool(exposure_keys) and (
-        bool(particle_keys) or bool(particle_set_keys)
-    )
-    use_particles = not bool(exposure_keys) and (
-        bool(particle_keys) or bool(particle_set_keys)
-    )
-    flat_results = {}
-    flat_counts = {}
-    unused_indices: Dict[Union[int, str], List[bool]] = {}
-    indices: Dict[Union[int, str], int] = {}
-
-    if use_particles:
-        for i, p in enumerate(particles):
-            unused_indices[p.particle_id] = [False for _ in keys]
-            indices[p.particle_id] = i
-    else:
-        for i, exp in enumerate(exposures):
-            unused_indices[exp.exposure_name] = [False for _ in keys]
-            indices[exp.exposure_name] = i
-    for key in keys:
-        if use_particles:
-            flat_results[key] = np.full(len(particles), None)
-        elif avg_particles:
-            flat_counts[key] = np.full(len(exposures), 0.0)
-            flat_results[key] = np.full(len(exposures), 0.0)
-        else:
-            flat_results[key] = np.full(len(exposures), None)
-    for sr in sql_result:
-        particle_tab_index = _particle_tab_index(sr)
-        exposure_tab_index = _exposure_tab_index(sr)
-        if use_particles:
-            particle_index = indices[sr[particle_tab_index].particle_id]
-            if not math.isinf(sr[0].value):
-                flat_results[sr[0].key][particle_index] = sr[0].value
-                unused_indices[sr[particle_tab_index].particle_id][
-                    keys.index(sr[0].key)
-                ] = True
-        else:
-            exposure_index = indices[sr[exposure_tab_index].exposure_name]
-            if avg_particles:
-                if not math.isinf(sr[0].value):
-                    flat_results[sr[0].key][exposure_index] += sr[0].value
-                    flat_counts[sr[0].key][exposure_index] += 1
-            else:
-                if not math.isinf(sr[0].value):
-                    flat_results[sr[0].key][exposure_index] = sr[0].value
-            if not math.isinf(sr[0].value):
-                unused_indices[sr[exposure_tab_index].exposure_name][
-                    keys.index(sr[0].key)
-                ] = True
-
-    collated_unused_indices = [k for k, v in unused_indices.items() if not all(v)]
-    indices_for_deletion = [indices[i] for i in collated_unused_indices]
-    for key in keys:
-        flat_results[key] = np.delete(flat_results[key], indices_for_deletion)
-        if avg_particles:
-            flat_counts[key] = np.delete(flat_counts[key], indices_for_deletion)
-    if avg_particles:
-        for k, v in flat_results.items():
-            flat_results[k] = np.divide(v, flat_counts[k])
-    return flat_results
+    if not (particle_keys or particle_set_keys):
+        return _extract_exposure_direct(sql_result, keys)
+    if exposure_keys:
+        return _extract_exposure_avg(sql_result, keys)
+    return _extract_particles(sql_result, keys)
 
 
 def extract_keys_with_foil_hole_averages(
-    sql_result: List[LegacyRow],
+    sql_result: Iterable[LegacyRow],
     exposure_keys: List[str],
     particle_keys: List[str],
     particle_set_keys: List[str],
     limits: Optional[Dict[str, Tuple[float, float]]] = None,
 ) -> Dict[str, ExtractedData]:
     limits = limits or {}
-    particles = {sr.particle_id for sr in sql_result if hasattr(sr, "particle_id")}
-    exposures = {sr.exposure_name for sr in sql_result}
     keys = exposure_keys + particle_keys + particle_set_keys
+    key_to_idx = {sys.intern(k): i for i, k in enumerate(keys)}
     avg_particles = bool(exposure_keys) and (
         bool(particle_keys) or bool(particle_set_keys)
     )
     use_particles = not bool(exposure_keys) and (
         bool(particle_keys) or bool(particle_set_keys)
     )
-    flat_results = {}
-    flat_counts = {}
-    unused_indices: Dict[Union[int, str], List[bool]] = {}
     indices: Dict[Union[int, str], int] = {}
-    foil_hole_sums: Dict[str, Dict[str, float]] = {}
-    foil_hole_counts: Dict[str, Dict[str, int]] = {}
-    if use_particles:
-        for i, p in enumerate(particles):
-            unused_indices[p] = [False for _ in keys]
-            indices[p] = i
-    else:
-        for i, exp in enumerate(exposures):
-            unused_indices[exp] = [False for _ in keys]
-            indices[exp] = i
-    for key in keys:
-        foil_hole_sums[key] = {}
-        foil_hole_counts[key] = {}
-        if use_particles:
-            flat_results[key] = np.full(len(particles), None)
-        elif avg_particles:
-            flat_counts[key] = np.full(len(exposures), 0.0)
-            flat_results[key] = np.full(len(exposures), 0.0)
-        else:
-            flat_results[key] = np.full(len(exposures), None)
-    for sr in sql_result:
-        current_bound = limits.get(sr.key, (-np.inf, np.inf))
-        if sr.value > current_bound[0] and sr.value < current_bound[1]:
-            if use_particles:
-                particle_index = indices[sr.particle_id]
-                if not math.isinf(sr.value):
-                    flat_results[sr.key][particle_index] = sr.value
-                    unused_indices[sr.particle_id][keys.index(sr.key)] = True
-            else:
-                exposure_index = indices[sr.exposure_name]
-                if avg_particles:
-                    if not math.isinf(sr.value):
-                        flat_results[sr.key][exposure_index] += sr.value
-                        flat_counts[sr.key][exposure_index] += 1
-                else:
-                    if not math.isinf(sr.value):
-                        flat_results[sr.key][exposure_index] = sr.value
-                if not math.isinf(sr.value):
-                    unused_indices[sr.exposure_name][keys.index(sr.key)] = True
-            try:
-                if not math.isinf(sr.value):
-                    foil_hole_sums[sr.key][sr.foil_hole_name] += sr.value
-                    foil_hole_counts[sr.key][sr.foil_hole_name] += 1
-            except KeyError:
-                if not math.isinf(sr.value):
-                    foil_hole_sums[sr.key][sr.foil_hole_name] = sr.value
-                    foil_hole_counts[sr.key][sr.foil_hole_name] = 1
-    foil_hole_averages = {}
-    for k in keys:
-        foil_hole_averages[k] = {
-            fh: foil_hole_sums[k][fh] / foil_hole_counts[k][fh]
-            for fh in foil_hole_sums[k].keys()
-        }
-    collated_unused_indices = [k for k, v in unused_indices.items() if not all(v)]
-    indices_for_deletion = [indices[i] for i in collated_unused_indices]
-    for key in keys:
-        flat_results[key] = np.delete(flat_results[key], indices_for_deletion)
-        if avg_particles:
-            flat_counts[key] = np.delete(flat_counts[key], indices_for_deletion)
-    if avg_particles:
-        for k, v in flat_results.items():
-            flat_results[k] = np.divide(v, flat_counts[k])
+    foil_hole_indices: Dict[str, int] = {}
+    scatter = _Scatter(len(keys), accumulate=avg_particles)
+    foil_hole_scatter = _Scatter(len(keys), accumulate=True)
+    entity_getter = _particle_id if use_particles else _exposure_name
+    for chunk in _chunks(sql_result):
+        key_list: List[int] = []
+        index_list: List[int] = []
+        value_list: List[float] = []
+        foil_hole_list: List[int] = []
+        for sr in chunk:
+            key, value = _key_value(sr)
+            current_bound = limits.get(key, (-np.inf, np.inf))
+            if (
+                value > current_bound[0]
+                and value < current_bound[1]
+                and not math.isinf(value)
+            ):
+                key_list.append(key_to_idx[key])
+                index_list.append(indices.setdefault(entity_getter(sr), len(indices)))
+                value_list.append(value)
+                foil_hole_list.append(
+                    foil_hole_indices.setdefault(
+                        _foil_hole_name(sr), len(foil_hole_indices)
+                    )
+                )
+        scatter.add(key_list, index_list, value_list, len(indices))
+        foil_hole_scatter.add(
+            key_list, foil_hole_list, value_list, len(foil_hole_indices)
+        )
+    flat_results = scatter.complete(key_to_idx)
+    foil_hole_averages, foil_hole_counts = foil_hole_scatter.group_averages(
+        keys, key_to_idx, foil_hole_indices
+    )
     extracted_data = {
         k: ExtractedData(
             flattened_data=flat_results[k],
@@ -207,13 +290,11 @@ def extract_keys_with_foil_hole_averages(
 
 
 def extract_keys_with_grid_square_averages(
-    sql_result: List[LegacyRow],
+    sql_result: Iterable[LegacyRow],
     exposure_keys: List[str],
     particle_keys: List[str],
     particle_set_keys: List[str],
 ) -> Dict[str, ExtractedData]:
-    particles = {sr.particle_id for sr in sql_result if hasattr(sr, "particle_id")}
-    exposures = {sr.exposure_name for sr in sql_result}
     keys = exposure_keys + particle_keys + particle_set_keys
     avg_particles = bool(exposure_keys) and (
         bool(particle_keys) or bool(particle_set_keys)
@@ -221,73 +302,43 @@ def extract_keys_with_grid_square_averages(
     use_particles = not bool(exposure_keys) and (
         bool(particle_keys) or bool(particle_set_keys)
     )
-    flat_results = {}
-    flat_counts = {}
-    unused_indices: Dict[Union[int, str], List[bool]] = {}
+    key_to_idx = {sys.intern(k): i for i, k in enumerate(keys)}
     indices: Dict[Union[int, str], int] = {}
-    grid_square_sums: Dict[str, Dict[str, float]] = {}
-    grid_square_counts: Dict[str, Dict[str, int]] = {}
-    if use_particles:
-        for i, p in enumerate(particles):
-            unused_indices[p] = [False for _ in keys]
-            indices[p] = i
-    else:
-        for i, exp in enumerate(exposures):
-            unused_indices[exp] = [False for _ in keys]
-            indices[exp] = i
-    for key in keys:
-        grid_square_counts[key] = {}
-        grid_square_sums[key] = {}
-        if use_particles:
-            flat_results[key] = np.full(len(particles), None)
-        elif avg_particles:
-            flat_counts[key] = np.full(len(exposures), 0.0)
-            flat_results[key] = np.full(len(exposures), 0.0)
-        else:
-            flat_results[key] = np.full(len(exposures), None)
-    for sr in sql_result:
-        if use_particles:
-            particle_index = indices[sr.particle_id]
-            if not math.isinf(sr.value):
-                flat_results[sr.key][particle_index] = sr.value
-                unused_indices[sr.particle_id][keys.index(sr.key)] = True
-        else:
-            exposure_index = indices[sr.exposure_name]
-            if avg_particles:
-                if not math.isinf(sr.value):
-                    flat_results[sr.key][exposure_index] += sr.value
-                    flat_counts[sr.key][exposure_index] += 1
-            else:
-                if not math.isinf(sr.value):
-                    flat_results[sr.key][exposure_index] = sr.value
-            if not math.isinf(sr.value):
-                unused_indices[sr.exposure_name][keys.index(sr.key)] = True
-        try:
-            if not math.isinf(sr.value):
-                grid_square_sums[sr.key][sr.grid_square_name] += sr.value
-                grid_square_counts[sr.key][sr.grid_square_name] += 1
-        except KeyError:
-            if not math.isinf(sr.value):
-                grid_square_sums[sr.key][sr.grid_square_name] = sr.value
-                grid_square_counts[sr.key][sr.grid_square_name] = 1
-    grid_square_averages = {}
-    for k in keys:
-        grid_square_averages[k] = {
-            gs: grid_square_sums[k][gs] / grid_square_counts[k][gs]
-            for gs in grid_square_sums[k].keys()
-        }
-    collated_unused_indices = [k for k, v in unused_indices.items() if not all(v)]
-    indices_for_deletion = [indices[i] for i in collated_unused_indices]
-    for key in keys:
-        flat_results[key] = np.delete(flat_results[key], indices_for_deletion)
-        if avg_particles:
-            flat_counts[key] = np.delete(flat_counts[key], indices_for_deletion)
-    if avg_particles:
-        for k, v in flat_results.items():
-            flat_results[k] = np.divide(v, flat_counts[k])
+    grid_square_indices: Dict[str, int] = {}
+    scatter = _Scatter(len(keys), accumulate=avg_particles)
+    grid_square_scatter = _Scatter(len(keys), accumulate=True)
+    entity_getter = _particle_id if use_particles else _exposure_name
+    for chunk in _chunks(sql_result):
+        key_list: List[int] = []
+        index_list: List[int] = []
+        grid_square_index_list: List[int] = []
+        value_list: List[float] = []
+        for sr in chunk:
+            key, value = _key_value(sr)
+            if math.isinf(value):
+                continue
+            key_list.append(key_to_idx[key])
+            index_list.append(indices.setdefault(entity_getter(sr), len(indices)))
+            grid_square_index_list.append(
+                grid_square_indices.setdefault(
+                    _grid_square_name(sr), len(grid_square_indices)
+                )
+            )
+            value_list.append(value)
+        scatter.add(key_list, index_list, value_list, len(indices))
+        grid_square_scatter.add(
+            key_list,
+            grid_square_index_list,
+            value_list,
+            len(grid_square_indices),
+        )
+    results = scatter.complete(key_to_idx)
+    grid_square_averages, grid_square_counts = grid_square_scatter.group_averages(
+        keys, key_to_idx, grid_square_indices
+    )
     extracted_data = {
         k: ExtractedData(
-            flattened_data=flat_results[k],
+            flattened_data=results[k],
             averages=grid_square_averages[k],
             counts=grid_square_counts[k],
         )
@@ -15,7 +15,7 @@ from smartem.data_model.structure import (
     extract_keys_with_foil_hole_averages,
     extract_keys_with_grid_square_averages,
 )
-from smartem.stage_model import find_point_pixel
+from smartem.stage_model import find_point_pixels
 
 
 def mrc_to_tensor(mrc_file: Path) -> Tensor:
@@ -149,16 +149,22 @@ class SmartEMDiskDataLoader(DataLoader):
         self._df = pd.read_csv(self._data_dir / labels_csv)
         if level == "foil_hole":
             self._df = self._df[self._df["foil_hole"].notna()]
-        with mrcfile.open(
-            (self._data_dir / self._df.iloc[0]["grid_square"]).with_suffix(".mrc")
+        with mrcfile.mmap(
+            (self._data_dir / self._df.iloc[0]["grid_square"]).with_suffix(".mrc"),
+            mode="r",
+            permissive=True,
         ) as _mrc:
             self._gs_mrc_size = _mrc.data.shape
         with Image.open(self._data_dir / self._df.iloc[0]["grid_square"]) as im:
             self._gs_jpeg_size = im.size
         for row in self._df:
             try:
-                with mrcfile.open(
-                    (self._data_dir / self._df.iloc[0]["foil_hole"]).with_suffix(".mrc")
+                with mrcfile.mmap(
+                    (self._data_dir / self._df.iloc[0]["foil_hole"]).with_suffix(
+                        ".mrc"
+                    ),
+                    mode="r",
+                    permissive=True,
                 ) as _mrc:
                     self._fh_mrc_size = _mrc.data.shape
                 with Image.open(self._data_dir / self._df.iloc[0]["foil_hole"]) as im:
@@ -198,53 +204,33 @@ class SmartEMDiskDataLoader(DataLoader):
             selected_df = self._df[
                 self._df["grid_square"] == _grid_squares[grid_square_idx]
             ]
-            drop_indices = []
+            spacings = selected_df["grid_square_pixel_size"].to_numpy(dtype=float)
             if self._mrc:
-                for ri, row in selected_df.iterrows():
-                    fh_centre = find_point_pixel(
-                        (
-                            row["foil_hole_x"],
-                            row["foil_hole_y"],
-                        ),
-                        (row["grid_square_x"], row["grid_square_y"]),
-                        row["grid_square_pixel_size"],
-                        (self._gs_mrc_size[1], self._gs_mrc_size[0]),
-                        xfactor=1,
-                        yfactor=-1,
-                    )
-                    if (
-                        fh_centre[0] < sub_sample_boundaries[0]
-                        or fh_centre[1] < sub_sample_boundaries[1]
-                        or fh_centre[0]
-                        > sub_sample_boundaries[0] + self._sub_sample_size[0]
-                        or fh_centre[1]
-                        > sub_sample_boundaries[1] + self._sub_sample_size[1]
-                    ):
-                        drop_indices.append(ri)
+                outer_size = (self._gs_mrc_size[1], self._gs_mrc_size[0])
             else:
-                for ri, row in selected_df.iterrows():
-                    fh_centre = find_point_pixel(
-                        (
-                            row["foil_hole_x"],
-                            row["foil_hole_y"],
-                        ),
-                        (row["grid_square_x"], row["grid_square_y"]),
-                        row["grid_square_pixel_size"]
-                        * (self._gs_mrc_size[1] / self._gs_jpeg_size[0]),
-                        self._gs_jpeg_size,
-                        xfactor=1,
-                        yfactor=-1,
-                    )
-                    if (
-                        fh_centre[0] < sub_sample_boundaries[0]
-                        or fh_centre[1] < sub_sample_boundaries[1]
-                        or fh_centre[0]
-                        > sub_sample_boundaries[0] + self._sub_sample_size[0]
-                        or fh_centre[1]
-                        > sub_sample_boundaries[1] + self._sub_sample_size[1]
-                    ):
-                        drop_indices.append(ri)
-            selected_df = selected_df.drop(drop_indices)
+                spacings = spacings * (self._gs_mrc_size[1] / self._gs_jpeg_size[0])
+                outer_size = self._gs_jpeg_size
+            fh_centres = find_point_pixels(
+                selected_df[["foil_hole_x", "foil_hole_y"]].to_numpy(dtype=float),
+                selected_df[["grid_square_x", "grid_square_y"]].to_numpy(dtype=float),
+                spacings[:, np.newaxis],
+                outer_size,
+                xfactor=1,
+                yfactor=-1,
+            )
+            outside = (
+                (fh_centres[:, 0] < sub_sample_boundaries[0])
+                | (fh_centres[:, 1] < sub_sample_boundaries[1])
+                | (
+                    fh_centres[:, 0]
+                    > sub_sample_boundaries[0] + self._sub_sample_size[0]
+                )
+                | (
+                    fh_centres[:, 1]
+                    > sub_sample_boundaries[1] + self._sub_sample_size[1]
+                )
+            )
+            selected_df = selected_df[~outside]
             averaged_df = selected_df.groupby("grid_square").mean()
             if len(averaged_df):
                 labels = [
@@ -1,6 +1,7 @@
 from __future__ import annotations
 
 import importlib.resources
+from functools import lru_cache
 
 import matplotlib
 
@@ -8,6 +9,7 @@ matplotlib.use("Qt5Agg")
 from pathlib import Path
 from typing import List, Optional
 
+from PyQt5.QtCore import QThreadPool
 from PyQt5.QtWidgets import (
     QApplication,
     QComboBox,
@@ -16,6 +18,7 @@ from PyQt5.QtWidgets import (
     QHBoxLayout,
     QLabel,
     QLineEdit,
+    QProgressBar,
     QPushButton,
     QTabWidget,
     QVBoxLayout,
@@ -25,7 +28,7 @@ from PyQt5.QtWidgets import (
 import smartem.gui
 from smartem.data_model import Project
 from smartem.data_model.extract import DataAPI
-from smartem.gui.qt.component_tab import ComponentTab
+from smartem.gui.qt.component_tab import ComponentTab, Worker
 from smartem.gui.qt.display import AtlasDisplay, MainDisplay
 from smartem.gui.qt.loader import (
     ExposureDataLoader,
@@ -37,13 +40,16 @@ from smartem.parsing.epu import create_atlas_and_tiles, parse_epu_dir, parse_epu
 from smartem.parsing.relion_default import gather_relion_defaults
 
 
+@lru_cache(maxsize=1)
+def _qt_style() -> str:
+    return importlib.resources.read_text(smartem.gui.qt, "qt_style.css")
+
+
 class App:
     def __init__(self, extractor: DataAPI):
         self.app = QApplication([])
         self.window = QtFrame(extractor)
-        self.app.setStyleSheet(
-            importlib.resources.read_text(smartem.gui.qt, "qt_style.css")
-        )
+        self.app.setStyleSheet(_qt_style())
 
     def start(self):
         self.window.resize(1600, 900)
@@ -84,6 +90,18 @@ class QtFrame(QWidget):
         self.setLayout(self.layout)
 
 
+def _parse_project(
+    epu_dir: Path, project_dir: Path, project_name: str, gather_defaults: bool
+):
+    data_api = DataAPI(project=project_name)
+    try:
+        parse_epu_dir(epu_dir, data_api, project_name)
+        if gather_defaults:
+            gather_relion_defaults(project_dir, data_api, project_name)
+    finally:
+        data_api.session.close()
+
+
 class ProjectLoader(ComponentTab):
     def __init__(
         self,
@@ -109,10 +127,7 @@ class ProjectLoader(ComponentTab):
         self.epu_dir = ""
         self.project_dir = ""
         self._combo = QComboBox()
-        projects = self._extractor.get_projects()
-        self._combo.addItem(None)
-        for proj in projects:
-            self._combo.addItem(proj)
+        self._combo.addItems([""] + sorted(self._extractor.get_projects()))
         self._combo.currentIndexChanged.connect(self._select_project)
         self._project_name = self._combo.currentText()
         self._name_input = QLineEdit()
@@ -155,6 +170,11 @@ class ProjectLoader(ComponentTab):
         self._create_gather_btn = QPushButton("Create and load default data")
         self._create_gather_btn.clicked.connect(self._create_and_gather)
         self.grid.addWidget(self._create_gather_btn, 6, 2)
+        self._progress = QProgressBar()
+        self._progress.setRange(0, 0)
+        self._progress.setVisible(False)
+        self.grid.addWidget(self._progress, 7, 1, 1, 2)
+        self._worker: Optional[Worker] = None
         self._button_check()
 
     def _button_check(self):
@@ -222,7 +242,14 @@ class ProjectLoader(ComponentTab):
         self._particle_loader.project = self._project_name
         self._particle_set_loader.project = self._project_name
 
-    def _create_project(self):
+    def _set_busy(self, busy: bool):
+        self._progress.setVisible(busy)
+        for btn in (self._load_btn, self._create_btn, self._create_gather_btn):
+            btn.setEnabled(not busy)
+        if not busy:
+            self._button_check()
+
+    def _create_project(self, gather_defaults: bool = False):
         self._project_name = self._name_input.text()
         found = self._extractor.set_project(self._project_name)
         if not found:
@@ -242,13 +269,36 @@ class ProjectLoader(ComponentTab):
             raise ValueError(
                 "Project record not found despite having just been inserted"
             )
-        parse_epu_dir(Path(self.epu_dir), self._extractor, self._project_name)
+        self._set_busy(True)
+        self._worker = Worker(
+            _parse_project,
+            Path(self.epu_dir),
+            Path(self.project_dir),
+            self._project_name,
+            gather_defaults,
+        )
+        self._worker.signals.finished.connect(self._project_parsed)
+        self._worker.signals.error.connect(self._project_parse_failed)
+        QThreadPool.globalInstance().start(self._worker)
+
+    def _project_parsed(self, result: None):
+        self._extractor.clear_caches()
         self._main_display._set_epu_directory(Path(self.epu_dir))
         self._main_display._set_data_size(Path(self.project_dir))
         self._main_display.project = self._project_name
         self._atlas_display.project = self._project_name
         self.refresh()
         self._update_loaders()
+        self._set_busy(False)
+
+    def _project_parse_failed(self, exception: Exception, trace: str):
+        self._set_busy(False)
+        self._report_error(
+            f"Failed to parse project {self._project_name}, "
+            "its data may be incomplete",
+            exception,
+            trace,
+        )
 
     def load(self):
         atlas_found = self._extractor.set_project(self._project_name)
@@ -262,11 +312,7 @@ class ProjectLoader(ComponentTab):
         self._update_loaders()
 
     def _create_and_gather(self):
-        self._create_project()
-        gather_relion_defaults(
-            Path(self.project_dir), self._extractor, self._project_name
-        )
-        self.refresh()
+        self._create_project(gather_defaults=True)
 
     def refresh(self):
         super().refresh()
@@ -1,8 +1,10 @@
+import traceback
 from multiprocessing import Process
 from threading import Thread
-from typing import List, Optional
+from typing import Any, Callable, List, Optional
 
-from PyQt5.QtWidgets import QWidget
+from PyQt5.QtCore import QObject, QRunnable, pyqtSignal
+from PyQt5.QtWidgets import QMessageBox, QWidget
 
 
 def background(
@@ -37,6 +39,28 @@ def background(
     return background_decorator
 
 
+class WorkerSignals(QObject):
+    finished = pyqtSignal(object)
+    error = pyqtSignal(Exception, str)
+
+
+class Worker(QRunnable):
+    def __init__(self, func: Callable[..., Any], *args, **kwargs):
+        super().__init__()
+        self._func = func
+        self._args = args
+        self._kwargs = kwargs
+        self.signals = WorkerSignals()
+
+    def run(self):
+        try:
+            result = self._func(*self._args, **self._kwargs)
+        except Exception as e:
+            self.signals.error.emit(e, traceback.format_exc())
+        else:
+            self.signals.finished.emit(result)
+
+
 class ComponentTab(QWidget):
     def __init__(self, *args, **kwargs):
         super().__init__()
@@ -50,6 +74,15 @@ class ComponentTab(QWidget):
         for refr in self._refreshers:
             refr.refresh()
 
+    def _report_error(self, message: str, exception: Exception, trace: str):
+        print(f"{message}\n{trace}")
+        box = QMessageBox(self)
+        box.setIcon(QMessageBox.Critical)
+        box.setWindowTitle("Error")
+        box.setText(f"{message}: {exception}")
+        box.setDetailedText(trace)
+        box.exec()
+
     def _background(self, _background_process, *args, **kwargs):
         children = kwargs.get("_children")
         try:
@@ -1,17 +1,21 @@
 from __future__ import annotations
 
+from functools import partial
+
 import matplotlib
 import matplotlib.ticker as mticker
-import mrcfile
 
 matplotlib.use("Qt5Agg")
+from collections import OrderedDict
 from pathlib import Path
-from typing import Dict, List, Optional, Tuple
+from typing import Dict, List, Optional, Set, Tuple, Union
 
 import numpy as np
-from matplotlib.backends.backend_qt5agg import FigureCanvasQTAgg
+from matplotlib.axes import Axes
+from matplotlib.colorbar import Colorbar
 from matplotlib.figure import Figure
-from PyQt5.QtGui import QPixmap, QTransform
+from PyQt5.QtCore import QSize, Qt, QThreadPool
+from PyQt5.QtGui import QImage, QImageReader, QPixmap
 from PyQt5.QtWidgets import (
     QComboBox,
     QGridLayout,
@@ -24,14 +28,139 @@ from PyQt5.QtWidgets import (
 from smartem.data_model import Atlas, Exposure, FoilHole, GridSquare
 from smartem.data_model.extract import DataAPI
 from smartem.data_model.structure import (
+    ExtractedData,
     extract_keys,
     extract_keys_with_foil_hole_averages,
     extract_keys_with_grid_square_averages,
 )
-from smartem.gui.qt.component_tab import ComponentTab
-from smartem.gui.qt.image_utils import ImageLabel, ParticleImageLabel
+from smartem.gui.qt.component_tab import ComponentTab, Worker
+from smartem.gui.qt.image_utils import ImageLabel, ParticleImageLabel, mrc_shape
 from smartem.gui.qt.plotting_utils import InteractivePlot
 
+_THUMBNAIL_SIZE = QSize(512, 512)
+_ATLAS_SIZE = QSize(1024, 1024)
+_PIXMAP_CACHE_SIZE = 128
+_ATLAS_PIXMAP_CACHE_SIZE = 16
+_PREFETCH_COUNT = 4
+
+_PixmapKey = Tuple[str, Tuple[int, int]]
+
+
+def _read_thumbnail(
+    image_path: str, flip: Tuple[int, int] = (1, 1), max_size: QSize = _THUMBNAIL_SIZE
+) -> QImage:
+    reader = QImageReader(image_path)
+    size = reader.size()
+    if size.isValid() and (
+        size.width() > max_size.width() or size.height() > max_size.height()
+    ):
+        reader.setScaledSize(size.scaled(max_size, Qt.KeepAspectRatio))
+    image = reader.read()
+    if flip != (1, 1):
+        image = image.mirrored(flip[0] < 0, flip[1] < 0)
+    return image
+
+
+def _read_thumbnail_for(key: _PixmapKey) -> Tuple[_PixmapKey, QImage]:
+    return key, _read_thumbnail(*key)
+
+
+class _PixmapCache:
+    def __init__(
+        self,
+        max_size: QSize = _THUMBNAIL_SIZE,
+        capacity: int = _PIXMAP_CACHE_SIZE,
+    ):
+        self._max_size = max_size
+        self._capacity = capacity
+        self._pixmaps: "OrderedDict[_PixmapKey, QPixmap]" = OrderedDict()
+
+    def __contains__(self, key: _PixmapKey) -> bool:
+        return key in self._pixmaps
+
+    def add(self, key: _PixmapKey, pixmap: QPixmap):
+        self._pixmaps[key] = pixmap
+        if len(self._pixmaps) > self._capacity:
+            self._pixmaps.popitem(last=False)
+
+    def get(self, image_path: str, flip: Tuple[int, int] = (1, 1)) -> QPixmap:
+        key = (image_path, flip)
+        if key in self._pixmaps:
+            self._pixmaps.move_to_end(key)
+            return self._pixmaps[key]
+        pixmap = QPixmap.fromImage(
+            _read_thumbnail(image_path, flip=flip, max_size=self._max_size)
+        )
+        self.add(key, pixmap)
+        return pixmap
+
+
+def _set_combo_items(combo: QComboBox, items: List[str]):
+    combo.blockSignals(True)
+    combo.clear()
+    combo.addItems(items)
+    combo.blockSignals(False)
+
+
+def _draw_histogram(
+    axes: Axes, values: Union[np.ndarray, List[float]], bins: int = 10, **kwargs
+):
+    values = np.asarray(values, dtype=float)
+    counts, edges = np.histogram(values[np.isfinite(values)], bins=bins)
+    axes.bar(edges[:-1], counts, width=np.diff(edges), align="edge", **kwargs)
+
+
+def _same_stats(a: Dict[str, np.ndarray], b: Dict[str, np.ndarray]) -> bool:
+    return list(a) == list(b) and all(
+        np.array_equal(a[k], b[k], equal_nan=True) for k in a
+    )
+
+
+def _draw_stats(
+    plot: InteractivePlot,
+    axes: Axes,
+    stats: Dict[str, np.ndarray],
+    colour_bar: Optional[Colorbar],
+    nan_to_num: bool = False,
+) -> Optional[Colorbar]:
+    try:
+        if colour_bar:
+            colour_bar.remove()
+    except (AttributeError, ValueError):
+        pass
+    colour_bar = None
+    axes.clear()
+    labels = list(stats.keys())
+    values = [np.asarray(v, dtype=float) for v in stats.values()]
+    if not any(v.size for v in values):
+        plot.set_data([])
+        plot.draw_idle()
+        return colour_bar
+    if len(values) == 1:
+        plot.set_data(values[0])
+        _draw_histogram(axes, values[0], color="darkturquoise")
+        axes.set_xlabel(labels[0])
+    if len(values) == 2:
+        plot.set_data(values)
+        axes.scatter(values[0], values[1], color="darkturquoise")
+        axes.set_xlabel(labels[0])
+        axes.set_ylabel(labels[1])
+    if len(values) > 2:
+        data = np.vstack(values)
+        if nan_to_num:
+            data = np.nan_to_num(data)
+        corr = np.corrcoef(data)
+        mat = axes.matshow(corr)
+        ticks_loc = (axes.get_xticks(), axes.get_yticks())
+        plot.set_data(corr)
+        axes.xaxis.set_major_locator(mticker.FixedLocator(ticks_loc[0][1:-1]))
+        axes.yaxis.set_major_locator(mticker.FixedLocator(ticks_loc[1][1:-1]))
+        axes.set_xticklabels(labels, rotation=45)
+        axes.set_yticklabels(labels)
+        colour_bar = axes.figure.colorbar(mat)
+    plot.draw_idle()
+    return colour_bar
+
 
 class MainDisplay(ComponentTab):
     def __init__(
@@ -43,10 +172,10 @@ class MainDisplay(ComponentTab):
         super().__init__(refreshers=refreshers)
         self._extractor = extractor
         self._epu_dir: Optional[Path] = None
-        self._data_size: Optional[Tuple[int, int]] = None
-        self._data: Dict[str, List[float]] = {}
+        self._data_size: Optional[Tuple[int, ...]] = None
+        self._data: Dict[str, np.ndarray] = {}
         self._foil_hole_averages: Dict[str, Dict[str, float]] = {}
-        self._particle_data: Dict[str, List[float]] = {}
+        self._particle_data: Dict[str, np.ndarray] = {}
         self._exposure_keys: List[str] = []
         self._particle_keys: List[str] = []
         self._particle_set_keys: List[str] = []
@@ -63,21 +192,33 @@ class MainDisplay(ComponentTab):
         self._data_list.setSelectionMode(QListWidget.MultiSelection)
         self._pick_list = QListWidget()
         self._pick_list.setSelectionMode(QListWidget.MultiSelection)
-        fh_fig = Figure()
+        fh_fig = Figure(tight_layout=True)
         fh_fig.set_facecolor("gray")
         self._foil_hole_stats_fig = fh_fig.add_subplot(111)
         self._foil_hole_stats_fig.set_facecolor("silver")
-        self._foil_hole_stats = FigureCanvasQTAgg(fh_fig)
-        gs_fig = Figure()
+        self._foil_hole_stats = InteractivePlot(fh_fig)
+        gs_fig = Figure(tight_layout=True)
         gs_fig.set_facecolor("gray")
         self._grid_square_stats_fig = gs_fig.add_subplot(111)
         self._grid_square_stats_fig.set_facecolor("silver")
-        self._grid_square_stats = FigureCanvasQTAgg(gs_fig)
-        ex_fig = Figure()
+        self._grid_square_stats = InteractivePlot(gs_fig)
+        ex_fig = Figure(tight_layout=True)
         ex_fig.set_facecolor("gray")
         self._exposure_stats_fig = ex_fig.add_subplot(111)
         self._exposure_stats_fig.set_facecolor("silver")
-        self._exposure_stats = FigureCanvasQTAgg(ex_fig)
+        self._exposure_stats = InteractivePlot(ex_fig)
+        self._square_lbl = ImageLabel(
+            None, None, (0, 0), None, parent=self, selection_box=self._square_combo
+        )
+        self._hole_lbl = ImageLabel(
+            None, None, (0, 0), None, parent=self, selection_box=self._foil_hole_combo
+        )
+        self._exposure_lbl = ParticleImageLabel(
+            None, [], (0, 0), selection_box=self._exposure_combo, parent=self
+        )
+        self.grid.addWidget(self._square_lbl, 1, 1)
+        self.grid.addWidget(self._hole_lbl, 1, 2)
+        self.grid.addWidget(self._exposure_lbl, 1, 3)
         self.grid.addWidget(self._square_combo, 2, 1)
         self.grid.addWidget(self._foil_hole_combo, 2, 2)
         self.grid.addWidget(self._exposure_combo, 2, 3)
@@ -88,7 +229,11 @@ class MainDisplay(ComponentTab):
         self.grid.addWidget(self._exposure_stats, 4, 3)
         self._grid_squares: List[GridSquare] = []
         self._foil_holes: List[FoilHole] = []
+        self._foil_holes_by_square: Dict[str, List[FoilHole]] = {}
         self._exposures: List[Exposure] = []
+        self._exposures_by_foil_hole: Dict[str, List[Exposure]] = {}
+        self._pixmaps = _PixmapCache()
+        self._prefetch_workers: Dict[_PixmapKey, Worker] = {}
         self._atlas_view = atlas_view
         self._colour_bar = None
         self._fh_colour_bar = None
@@ -103,47 +248,77 @@ class MainDisplay(ComponentTab):
             "source": [],
             "set_group": [],
         }
+        self._data_key_sets: Dict[str, Set[str]] = {k: set() for k in self._data_keys}
+        self._pick_key_sets: Dict[str, Set[str]] = {k: set() for k in self._pick_keys}
 
         self._gather_btn = QPushButton("Gather data")
         self._gather_btn.clicked.connect(self._gather_data)
         self.grid.addWidget(self._gather_btn, 3, 1)
+        self._gather_worker: Optional[Worker] = None
         self.project = ""
 
     def load(self):
         self._grid_squares = self._extractor.get_grid_squares(project=self.project)
-        self._square_combo.clear()
-        for gs in self._grid_squares:
-            self._square_combo.addItem(gs.grid_square_name)
-        self._update_fh_choices(self._grid_squares[0].grid_square_name)
+        self._foil_holes_by_square = self._extractor.get_foil_holes_many(
+            [gs.grid_square_name for gs in self._grid_squares]
+        )
+        _set_combo_items(
+            self._square_combo, [gs.grid_square_name for gs in self._grid_squares]
+        )
+        self._select_square(self._square_combo.currentIndex())
         self.refresh()
 
     def _set_epu_directory(self, epu_dir: Path):
         self._epu_dir = epu_dir
 
+    def _pixmap(self, image_path: Path, flip: Tuple[int, int] = (1, 1)) -> QPixmap:
+        return self._pixmaps.get(str(image_path), flip=flip)
+
+    def _prefetch_pixmaps(self, keys: List[_PixmapKey]):
+        for key in keys:
+            if key in self._pixmaps or key in self._prefetch_workers:
+                continue
+            worker = Worker(_read_thumbnail_for, key)
+            worker.signals.finished.connect(self._prefetched_pixmap)
+            worker.signals.error.connect(partial(self._prefetch_failed, key))
+            self._prefetch_workers[key] = worker
+            QThreadPool.globalInstance().start(worker)
+
+    def _prefetch_failed(self, key: _PixmapKey, exception: Exception, trace: str):
+        self._prefetch_workers.pop(key, None)
+        print(f"Failed to prefetch {key[0]}: {exception}\n{trace}")
+
+    def _prefetched_pixmap(self, result: Tuple[_PixmapKey, QImage]):
+        key, image = result
+        self._prefetch_workers.pop(key, None)
+        if key not in self._pixmaps and not image.isNull():
+            self._pixmaps.add(key, QPixmap.fromImage(image))
+
     def _set_data_size(self, project_dir: Path):
         try:
             mcdir = project_dir / "MotionCorr" / "job002" / "Movies"
             first_mrc = next(iter(mcdir.glob("**/*.mrc")))
-            with mrcfile.open(first_mrc) as mrc:
-                self._data_size = mrc.data.shape
+            self._data_size = mrc_shape(first_mrc)
         except Exception:
             return
 
-    def _gather_atlas_data(self):
-        _grid_square = self._grid_squares[self._square_combo.currentIndex()]
-        _atlas = self._extractor.get_atlases(project=self.project)
-        atlas_sql_data = self._extractor.get_atlas_info(
+    def _extract_atlas_data(self, extractor: DataAPI) -> Dict[str, ExtractedData]:
+        _atlas = extractor.get_atlases(project=self.project)
+        atlas_sql_data = extractor.iter_atlas_info(
             _atlas.atlas_id,
             self._exposure_keys,
             self._particle_keys,
             self._particle_set_keys,
         )
-        extracted_atlas_data = extract_keys_with_grid_square_averages(
+        return extract_keys_with_grid_square_averages(
             atlas_sql_data,
             self._exposure_keys,
             self._particle_keys,
             self._particle_set_keys,
         )
+
+    def _show_atlas_data(self, extracted_atlas_data: Dict[str, ExtractedData]):
+        _grid_square = self._grid_squares[self._square_combo.currentIndex()]
         atlas_data = {k: v.flattened_data for k, v in extracted_atlas_data.items()}
         grid_square_averages = {k: v.averages for k, v in extracted_atlas_data.items()}
         if self._atlas_view and self._epu_dir:
@@ -156,26 +331,28 @@ class MainDisplay(ComponentTab):
                 data_changed=True,
             )
 
-    def _gather_grid_square_data(self):
-        foil_hole_exposures = {}
-        for fh in self._foil_holes:
-            foil_hole_exposures[fh.foil_hole_name] = [
-                e.exposure_name
-                for e in self._extractor.get_exposures(foil_hole_name=fh.foil_hole_name)
-            ]
+    def _gather_atlas_data(self):
+        self._show_atlas_data(self._extract_atlas_data(self._extractor))
 
-        sql_data = self._extractor.get_grid_square_info(
-            self._square_combo.currentText(),
+    def _extract_grid_square_data(
+        self, extractor: DataAPI, grid_square_name: str
+    ) -> Dict[str, ExtractedData]:
+        sql_data = extractor.get_grid_square_info(
+            grid_square_name,
             self._exposure_keys,
             self._particle_keys,
             self._particle_set_keys,
         )
-        extracted_grid_square_data = extract_keys_with_foil_hole_averages(
+        return extract_keys_with_foil_hole_averages(
             sql_data,
             self._exposure_keys,
             self._particle_keys,
             self._particle_set_keys,
         )
+
+    def _set_grid_square_data(
+        self, extracted_grid_square_data: Dict[str, ExtractedData]
+    ):
         self._data = {
             k: v.flattened_data for k, v in extracted_grid_square_data.items()
         }
@@ -183,39 +360,99 @@ class MainDisplay(ComponentTab):
             k: v.averages for k, v in extracted_grid_square_data.items()
         }
 
-    def _gather_foil_hole_data(self):
-        sql_data = self._extractor.get_foil_hole_info(
-            self._foil_hole_combo.currentText(),
+    def _gather_grid_square_data(self):
+        self._set_grid_square_data(
+            self._extract_grid_square_data(
+                self._extractor, self._square_combo.currentText()
+            )
+        )
+
+    def _extract_foil_hole_data(
+        self, extractor: DataAPI, foil_hole_name: str
+    ) -> Dict[str, np.ndarray]:
+        sql_data = extractor.get_foil_hole_info(
+            foil_hole_name,
             self._exposure_keys,
             self._particle_keys,
             self._particle_set_keys,
         )
-        key_extracted_data = extract_keys(
+        return extract_keys(
             sql_data,
             self._exposure_keys,
             self._particle_keys,
             self._particle_set_keys,
         )
+
+    def _show_foil_hole_data(self, key_extracted_data: Dict[str, np.ndarray]):
         try:
             self._update_foil_hole_stats(key_extracted_data)
         except KeyError:
             pass
 
+    def _gather_foil_hole_data(self):
+        self._show_foil_hole_data(
+            self._extract_foil_hole_data(
+                self._extractor, self._foil_hole_combo.currentText()
+            )
+        )
+
+    def _extract_gathered_data(
+        self, grid_square_name: str, foil_hole_name: str
+    ) -> Dict[str, dict]:
+        data_api = DataAPI(project=self.project)
+        try:
+            return {
+                "grid_square": self._extract_grid_square_data(
+                    data_api, grid_square_name
+                ),
+                "foil_hole": self._extract_foil_hole_data(data_api, foil_hole_name),
+                "atlas": self._extract_atlas_data(data_api),
+            }
+        finally:
+            data_api.session.close()
+
     def _gather_data(self, evt):
         selected_keys = [d.text() for d in self._data_list.selectedItems()]
         self._exposure_keys = [
-            k for k in selected_keys if k in self._data_keys["micrograph"]
+            k for k in selected_keys if k in self._data_key_sets["micrograph"]
         ]
         self._particle_keys = [
-            k for k in selected_keys if k in self._data_keys["particle"]
+            k for k in selected_keys if k in self._data_key_sets["particle"]
         ]
         self._particle_set_keys = [
-            k for k in selected_keys if k in self._data_keys["particle_set"]
+            k for k in selected_keys if k in self._data_key_sets["particle_set"]
         ]
 
-        self._gather_grid_square_data()
+        self._set_gathering(True)
+        self._gather_worker = Worker(
+            self._extract_gathered_data,
+            self._square_combo.currentText(),
+            self._foil_hole_combo.currentText(),
+        )
+        self._gather_worker.signals.finished.connect(self._data_extracted)
+        self._gather_worker.signals.error.connect(self._data_extraction_failed)
+        QThreadPool.globalInstance().start(self._gather_worker)
+
+    def _set_gathering(self, gathering: bool):
+        # the gathered data is drawn against the current selection, so it
+        # must not change while the worker runs
+        for widget in (
+            self._gather_btn,
+            self._square_combo,
+            self._foil_hole_combo,
+            self._exposure_combo,
+        ):
+            widget.setEnabled(not gathering)
+
+    def _data_extraction_failed(self, exception: Exception, trace: str):
+        self._set_gathering(False)
+        self._report_error("Failed to gather data", exception, trace)
 
-        self._gather_foil_hole_data()
+    def _data_extracted(self, extracted: Dict[str, dict]):
+        self._set_gathering(False)
+        self._set_grid_square_data(extracted["grid_square"])
+
+        self._show_foil_hole_data(extracted["foil_hole"])
 
         self._data_gathered = True
 
@@ -237,38 +474,41 @@ class MainDisplay(ComponentTab):
             )
         self._update_grid_square_stats(self._data)
 
-        self._gather_atlas_data()
+        self._show_atlas_data(extracted["atlas"])
 
     def _select_square(self, index: int):
         if self._data_gathered:
             self._gather_grid_square_data()
             self._update_grid_square_stats(self._data)
         try:
-            square_lbl = self._draw_grid_square(
-                self._grid_squares[index],
-                foil_hole=self._foil_holes[self._foil_hole_combo.currentIndex()],
-            )
+            grid_square = self._grid_squares[index]
         except IndexError:
-            try:
-                square_lbl = self._draw_grid_square(self._grid_squares[index])
-            except IndexError:
-                return
-        self.grid.addWidget(square_lbl, 1, 1)
+            return
+        # selecting the first foil hole draws the square with its overlay
         self._update_fh_choices(self._square_combo.currentText())
+        if not self._foil_holes:
+            self._draw_grid_square(grid_square)
 
         if self._atlas_view and self._epu_dir:
             self._atlas_view.load(
                 self._epu_dir,
-                grid_square=self._grid_squares[index],
+                grid_square=grid_square,
                 all_grid_squares=self._grid_squares,
             )
 
     def _select_foil_hole(self, index: int):
         try:
-            hole_lbl = self._draw_foil_hole(self._foil_holes[index], flip=(-1, -1))
+            self._draw_foil_hole(self._foil_holes[index], flip=(-1, -1))
         except IndexError:
             return
-        self.grid.addWidget(hole_lbl, 1, 2)
+        if self._epu_dir:
+            self._prefetch_pixmaps(
+                [
+                    (str(self._epu_dir / fh.thumbnail), (-1, -1))
+                    for fh in self._foil_holes[index + 1 : index + 1 + _PREFETCH_COUNT]
+                    if fh.thumbnail
+                ]
+            )
         self._update_exposure_choices(self._foil_hole_combo.currentText())
         self._draw_grid_square(
             self._grid_squares[self._square_combo.currentIndex()],
@@ -280,175 +520,37 @@ class MainDisplay(ComponentTab):
         ):
             self._gather_foil_hole_data()
 
-    def _update_grid_square_stats(self, stats: Dict[str, List[float]]):
-        gs_fig = Figure(tight_layout=True)
-        gs_fig.set_facecolor("gray")
-        self._grid_square_stats_fig = gs_fig.add_subplot(111)
-        self._grid_square_stats_fig.set_facecolor("silver")
-        self._grid_square_stats = InteractivePlot(gs_fig)
-        self.grid.addWidget(self._grid_square_stats, 4, 1)
-        try:
-            if self._colour_bar:
-                self._colour_bar.remove()
-        except (AttributeError, ValueError):
-            pass
-        if len(stats.keys()) == 1:
-            self._grid_square_stats.set_data(list(stats.values())[0])
-            self._grid_square_stats_fig.hist(
-                list(stats.values())[0], color="darkturquoise"
-            )
-            self._grid_square_stats_fig.axes.set_xlabel(list(stats.keys())[0])
-        if len(stats.keys()) == 2:
-            labels = []
-            data = []
-            for k, v in stats.items():
-                labels.append(k)
-                data.append(v)
-            self._grid_square_stats.set_data(data)
-            self._grid_square_stats_fig.scatter(
-                data[0],
-                data[1],
-                color="darkturquoise",
-            )
-            self._grid_square_stats_fig.axes.set_xlabel(labels[0])
-            self._grid_square_stats_fig.axes.set_ylabel(labels[1])
-        if len(stats.keys()) > 2:
-            labels = []
-            data = []
-            for k, v in stats.items():
-                labels.append(k)
-                data.append(list(v))
-            for i, _ in enumerate(data):
-                data[i] = np.nan_to_num(_)
-            corr = np.corrcoef(data)
-            mat = self._grid_square_stats_fig.matshow(corr)
-            ticks_loc = (
-                self._grid_square_stats_fig.axes.get_xticks(),
-                self._grid_square_stats_fig.axes.get_yticks(),
-            )
-            self._grid_square_stats.set_data(corr)
-            self._grid_square_stats_fig.xaxis.set_major_locator(
-                mticker.FixedLocator(ticks_loc[0][1:-1])
-            )
-            self._grid_square_stats_fig.yaxis.set_major_locator(
-                mticker.FixedLocator(ticks_loc[1][1:-1])
-            )
-            self._grid_square_stats_fig.axes.set_xticklabels(labels, rotation=45)
-            self._grid_square_stats_fig.axes.set_yticklabels(labels)
-            self._colour_bar = self._grid_square_stats_fig.figure.colorbar(mat)
-        self._grid_square_stats.draw()
+    def _update_grid_square_stats(self, stats: Dict[str, np.ndarray]):
+        self._colour_bar = _draw_stats(
+            self._grid_square_stats,
+            self._grid_square_stats_fig,
+            stats,
+            self._colour_bar,
+            nan_to_num=True,
+        )
 
-    def _update_foil_hole_stats(self, stats: Dict[str, List[float]]):
-        fh_fig = Figure(tight_layout=True)
-        fh_fig.set_facecolor("gray")
-        self._foil_hole_stats_fig = fh_fig.add_subplot(111)
-        self._foil_hole_stats_fig.set_facecolor("silver")
-        self._foil_hole_stats = InteractivePlot(fh_fig)
-        self.grid.addWidget(self._foil_hole_stats, 4, 2)
-        try:
-            if self._fh_colour_bar:
-                self._fh_colour_bar.remove()
-        except (AttributeError, ValueError):
-            pass
-        if len(stats.keys()) == 1:
-            self._foil_hole_stats.set_data(list(stats.values())[0])
-            self._foil_hole_stats_fig.hist(
-                list(stats.values())[0], color="darkturquoise"
-            )
-            self._foil_hole_stats_fig.axes.set_xlabel(list(stats.keys())[0])
-        if len(stats.keys()) == 2:
-            labels = []
-            data = []
-            for k, v in stats.items():
-                labels.append(k)
-                data.append(v)
-            self._foil_hole_stats.set_data(data)
-            self._foil_hole_stats_fig.scatter(data[0], data[1], color="darkturquoise")
-            self._foil_hole_stats_fig.axes.set_xlabel(labels[0])
-            self._foil_hole_stats_fig.axes.set_ylabel(labels[1])
-        if len(stats.keys()) > 2:
-            labels = []
-            data = []
-            for k, v in stats.items():
-                labels.append(k)
-                data.append(list(v))
-            corr = np.corrcoef(data)
-            mat = self._foil_hole_stats_fig.matshow(corr)
-            ticks_loc = (
-                self._foil_hole_stats_fig.axes.get_xticks(),
-                self._foil_hole_stats_fig.axes.get_yticks(),
-            )
-            self._foil_hole_stats.set_data(corr)
-            self._foil_hole_stats_fig.xaxis.set_major_locator(
-                mticker.FixedLocator(ticks_loc[0][1:-1])
-            )
-            self._foil_hole_stats_fig.yaxis.set_major_locator(
-                mticker.FixedLocator(ticks_loc[1][1:-1])
-            )
-            self._foil_hole_stats_fig.axes.set_xticklabels(labels, rotation=45)
-            self._foil_hole_stats_fig.axes.set_yticklabels(labels)
-            self._fh_colour_bar = self._foil_hole_stats_fig.figure.colorbar(mat)
-        self._foil_hole_stats.draw()
+    def _update_foil_hole_stats(self, stats: Dict[str, np.ndarray]):
+        self._fh_colour_bar = _draw_stats(
+            self._foil_hole_stats,
+            self._foil_hole_stats_fig,
+            stats,
+            self._fh_colour_bar,
+        )
 
     def _update_foil_hole_stats_picks(self, stats: Dict[str, List[int]]):
         if len(stats.keys()) == 2:
             size_lists = list(stats.values())
             diffs = [p2 - p1 for p1, p2 in zip(size_lists[0], size_lists[1])]
-            self._foil_hole_stats_fig.hist(diffs)
+            _draw_histogram(self._foil_hole_stats_fig, diffs)
             self._foil_hole_stats.draw()
 
-    def _update_exposure_stats(self, stats: Dict[str, List[float]]):
-        ex_fig = Figure(tight_layout=True)
-        ex_fig.set_facecolor("gray")
-        self._exposure_stats_fig = ex_fig.add_subplot(111)
-        self._exposure_stats_fig.set_facecolor("silver")
-        self._exposure_stats = InteractivePlot(ex_fig)
-        self.grid.addWidget(self._exposure_stats, 4, 3)
-        try:
-            if self._exp_colour_bar:
-                self._exp_colour_bar.remove()
-        except (AttributeError, ValueError):
-            pass
-        if len(stats.keys()) == 1:
-            self._exposure_stats.set_data(list(stats.values())[0])
-            self._exposure_stats_fig.hist(
-                list(stats.values())[0], color="darkturquoise"
-            )
-            self._exposure_stats_fig.axes.set_xlabel(list(stats.keys())[0])
-        if len(stats.keys()) == 2:
-            labels = []
-            data = []
-            for k, v in stats.items():
-                labels.append(k)
-                data.append(v)
-            self._exposure_stats.set_data(data)
-            self._exposure_stats_fig.scatter(data[0], data[1], color="darkturquoise")
-            self._exposure_stats_fig.axes.set_xlabel(labels[0])
-            self._exposure_stats_fig.axes.set_ylabel(labels[1])
-        if len(stats.keys()) > 2:
-            labels = []
-            data = []
-            for k, v in stats.items():
-                labels.append(k)
-                data.append(list(v))
-            corr = np.corrcoef(data)
-            mat = self._exposure_stats_fig.matshow(corr)
-            ticks_loc = (
-                self._exposure_stats_fig.axes.get_xticks(),
-                self._exposure_stats_fig.axes.get_yticks(),
-            )
-            self._exposure_stats.set_data(corr)
-            self._exposure_stats_fig.xaxis.set_major_locator(
-                mticker.FixedLocator(ticks_loc[0][1:-1])
-            )
-            self._exposure_stats_fig.yaxis.set_major_locator(
-                mticker.FixedLocator(ticks_loc[1][1:-1])
-            )
-            self._exposure_stats_fig.axes.set_xticklabels(labels, rotation=45)
-            self._exposure_stats_fig.axes.set_yticklabels(labels)
-            self._exp_colour_bar = self._exposure_stats_fig.figure.colorbar(mat)
-
-        self._exposure_stats.draw()
+    def _update_exposure_stats(self, stats: Dict[str, np.ndarray]):
+        self._exp_colour_bar = _draw_stats(
+            self._exposure_stats,
+            self._exposure_stats_fig,
+            stats,
+            self._exp_colour_bar,
+        )
 
     def _draw_grid_square(
         self,
@@ -458,43 +560,37 @@ class MainDisplay(ComponentTab):
     ) -> QLabel:
         if not self._epu_dir or not grid_square.thumbnail:
             return
-        square_pixmap = QPixmap(str(self._epu_dir / grid_square.thumbnail))
-        if flip != (1, 1):
-            square_pixmap = square_pixmap.transformed(QTransform().scale(*flip))
+        square_pixmap = self._pixmap(self._epu_dir / grid_square.thumbnail, flip=flip)
         if foil_hole and self._epu_dir:
             qsize = square_pixmap.size()
-            imvs: Optional[list] = None
-            _key = None
-            if len(self._data.keys()) == 1:
-                _key = list(self._data.keys())[0]
-                imvs = [
-                    list(self._foil_hole_averages.values())[0].get(fh.foil_hole_name)
-                    for fh in self._foil_holes
-                    if fh != foil_hole and fh.thumbnail
-                ]
-            square_lbl = ImageLabel(
+            skip_name = foil_hole.foil_hole_name
+            with_values = len(self._data) == 1
+            averages: Dict[str, float] = (
+                next(iter(self._foil_hole_averages.values())) if with_values else {}
+            )
+            extra_images = []
+            values = []
+            for fh in self._foil_holes:
+                if fh.foil_hole_name == skip_name or not fh.thumbnail:
+                    continue
+                extra_images.append(fh)
+                if with_values:
+                    values.append(averages.get(fh.foil_hole_name))
+            imvs = values if with_values else None
+            value = averages.get(skip_name)
+            self._square_lbl.update_overlay(
                 grid_square,
                 foil_hole,
                 (qsize.width(), qsize.height()),
                 self._epu_dir,
-                parent=self,
-                value=list(self._foil_hole_averages.values())[0].get(
-                    foil_hole.foil_hole_name
-                )
-                if _key
-                else None,
-                extra_images=[
-                    fh for fh in self._foil_holes if fh != foil_hole and fh.thumbnail
-                ],
+                value=value,
+                extra_images=extra_images,
                 image_values=imvs,
-                selection_box=self._square_combo,
             )
-            self.grid.addWidget(square_lbl, 1, 1)
-            square_lbl.setPixmap(square_pixmap)
         else:
-            square_lbl = QLabel(self)
-            square_lbl.setPixmap(square_pixmap)
-        return square_lbl
+            self._square_lbl.update_overlay(grid_square, None, (0, 0), self._epu_dir)
+        self._square_lbl.setPixmap(square_pixmap)
+        return self._square_lbl
 
     def _draw_foil_hole(
         self,
@@ -505,32 +601,18 @@ class MainDisplay(ComponentTab):
         if not self._epu_dir:
             return
         if foil_hole.thumbnail:
-            hole_pixmap = QPixmap(str(self._epu_dir / foil_hole.thumbnail))
-            if flip != (1, 1):
-                hole_pixmap = hole_pixmap.transformed(QTransform().scale(*flip))
-        if exposure and self._epu_dir:
-            if foil_hole.thumbnail:
-                qsize = hole_pixmap.size()
-                hole_lbl = ImageLabel(
-                    foil_hole,
-                    exposure,
-                    (qsize.width(), qsize.height()),
-                    self._epu_dir,
-                    parent=self,
-                    selection_box=self._foil_hole_combo,
-                )
-                self.grid.addWidget(hole_lbl, 1, 2)
-                hole_lbl.setPixmap(hole_pixmap)
-            else:
-                hole_lbl = QLabel(self)
+            hole_pixmap = self._pixmap(self._epu_dir / foil_hole.thumbnail, flip=flip)
+            qsize = hole_pixmap.size()
+            self._hole_lbl.update_overlay(
+                foil_hole, exposure, (qsize.width(), qsize.height()), self._epu_dir
+            )
+            self._hole_lbl.setPixmap(hole_pixmap)
         else:
-            hole_lbl = QLabel(self)
-            if foil_hole.thumbnail:
-                hole_lbl.setPixmap(hole_pixmap)
-        return hole_lbl
+            self._hole_lbl.update_overlay(foil_hole, None, (0, 0), self._epu_dir)
+            self._hole_lbl.clear()
+        return self._hole_lbl
 
     def _select_exposure(self, index: int):
-        exposure_lbl = QLabel(self)
         try:
             _project = self._extractor.get_project(project_name=self.project)
             _epu_version = _project.acquisition_software_version
@@ -538,12 +620,11 @@ class MainDisplay(ComponentTab):
                 int(_epu_version.split(".")[0]) >= 2
                 and int(_epu_version.split(".")[1]) > 12
             ):
-                exposure_lbl = self._draw_exposure(self._exposures[index], flip=(1, -1))
+                self._draw_exposure(self._exposures[index], flip=(1, -1))
             else:
-                exposure_lbl = self._draw_exposure(self._exposures[index], flip=(1, 1))
+                self._draw_exposure(self._exposures[index], flip=(1, 1))
         except IndexError:
             return
-        self.grid.addWidget(exposure_lbl, 1, 3)
         if self._foil_holes:
             self._draw_foil_hole(
                 self._foil_holes[self._foil_hole_combo.currentIndex()],
@@ -573,14 +654,12 @@ class MainDisplay(ComponentTab):
     ) -> QLabel:
         if not self._epu_dir or not exposure.thumbnail:
             return
-        exposure_pixmap = QPixmap(str(self._epu_dir / exposure.thumbnail))
-        if flip != (1, 1):
-            exposure_pixmap = exposure_pixmap.transformed(QTransform().scale(*flip))
+        exposure_pixmap = self._pixmap(self._epu_dir / exposure.thumbnail, flip=flip)
         qsize = exposure_pixmap.size()
         particles = []
         if self._pick_list.selectedItems():
             for p in self._pick_list.selectedItems():
-                if p.text() in self._pick_keys["source"]:
+                if p.text() in self._pick_key_sets["source"]:
                     exp_parts = self._extractor.get_particles(
                         exposure_name=exposure.exposure_name, source=p.text()
                     )
@@ -594,36 +673,46 @@ class MainDisplay(ComponentTab):
             particles = [
                 self._extractor.get_particles(exposure_name=exposure.exposure_name)
             ]
-        with mrcfile.open(
+        thumbnail_size = mrc_shape(
             (self._epu_dir / exposure.thumbnail).with_suffix(".mrc")
-        ) as mrc:
-            thumbnail_size = mrc.data.shape
-        exposure_lbl = ParticleImageLabel(
+        )
+        self._exposure_lbl.update_particles(
             exposure,
             particles,
             (qsize.width(), qsize.height()),
             image_scale=0.5
             if self._data_size is None
             else thumbnail_size[0] / self._data_size[0],
-            selection_box=self._exposure_combo,
         )
-        self.grid.addWidget(exposure_lbl, 1, 3)
-        exposure_lbl.setPixmap(exposure_pixmap)
-        return exposure_lbl
+        self._exposure_lbl.setPixmap(exposure_pixmap)
+        return self._exposure_lbl
 
     def _update_fh_choices(self, grid_square_name: str):
-        self._foil_holes = self._extractor.get_foil_holes(
-            grid_square_name=grid_square_name
+        if grid_square_name in self._foil_holes_by_square:
+            self._foil_holes = self._foil_holes_by_square[grid_square_name]
+        else:
+            self._foil_holes = self._extractor.get_foil_holes(
+                grid_square_name=grid_square_name
+            )
+        self._exposures_by_foil_hole = self._extractor.get_exposures_many(
+            [fh.foil_hole_name for fh in self._foil_holes]
+        )
+        _set_combo_items(
+            self._foil_hole_combo, [fh.foil_hole_name for fh in self._foil_holes]
         )
-        self._foil_hole_combo.clear()
-        for fh in self._foil_holes:
-            self._foil_hole_combo.addItem(fh.foil_hole_name)
+        self._select_foil_hole(self._foil_hole_combo.currentIndex())
 
     def _update_exposure_choices(self, foil_hole_name: str):
-        self._exposures = self._extractor.get_exposures(foil_hole_name=foil_hole_name)
-        self._exposure_combo.clear()
-        for ex in self._exposures:
-            self._exposure_combo.addItem(ex.exposure_name)
+        if foil_hole_name in self._exposures_by_foil_hole:
+            self._exposures = self._exposures_by_foil_hole[foil_hole_name]
+        else:
+            self._exposures = self._extractor.get_exposures(
+                foil_hole_name=foil_hole_name
+            )
+        _set_combo_items(
+            self._exposure_combo, [ex.exposure_name for ex in self._exposures]
+        )
+        self._select_exposure(self._exposure_combo.currentIndex())
 
     def refresh(self):
         super().refresh()
@@ -635,9 +724,9 @@ class MainDisplay(ComponentTab):
         self._data_keys["particle_set"] = self._extractor.get_particle_set_keys(
             self.project
         )
-        for keys in self._data_keys.values():
-            for k in keys:
-                self._data_list.addItem(k)
+        for category, keys in self._data_keys.items():
+            self._data_key_sets[category] = set(keys)
+            self._data_list.addItems(keys)
 
         # self._pick_keys["source"] = self._extractor.get_particle_info_sources(
         #     self.project
@@ -645,9 +734,9 @@ class MainDisplay(ComponentTab):
         self._pick_keys["set_group"] = self._extractor.get_particle_set_group_names(
             self.project
         )
-        for keys in self._pick_keys.values():
-            for k in keys:
-                self._pick_list.addItem(k)
+        for category, keys in self._pick_keys.items():
+            self._pick_key_sets[category] = set(keys)
+            self._pick_list.addItems(keys)
 
 
 class AtlasDisplay(ComponentTab):
@@ -660,13 +749,31 @@ class AtlasDisplay(ComponentTab):
         atlas_fig.set_facecolor("gray")
         self._atlas_stats_fig = atlas_fig.add_subplot(111)
         self._atlas_stats_fig.set_facecolor("silver")
-        self._atlas_stats = FigureCanvasQTAgg(atlas_fig)
-        self._data: Dict[str, List[float]] = {}
+        self._atlas_stats = InteractivePlot(atlas_fig)
+        self._atlas_lbl = ImageLabel(
+            None, None, (0, 0), None, parent=self, overwrite_readout=True
+        )
+        self._tile_lbl = ImageLabel(None, None, (0, 0), None, parent=self)
+        atlas_vbox = QVBoxLayout()
+        atlas_vbox.addWidget(self._atlas_lbl)
+        atlas_vbox.addStretch()
+        self.grid.addLayout(atlas_vbox, 0, 0)
+        tile_vbox = QVBoxLayout()
+        tile_vbox.addWidget(self._tile_lbl)
+        tile_vbox.addWidget(self._atlas_stats)
+        tile_vbox.addStretch()
+        self.grid.addLayout(tile_vbox, 0, 1)
+        self._data: Dict[str, np.ndarray] = {}
         self._grid_square_averages: Dict[str, Dict[str, float]] = {}
-        self._particle_data: Dict[str, List[float]] = {}
+        self._particle_data: Dict[str, np.ndarray] = {}
         self._colour_bar = None
         self._grid_square: Optional[GridSquare] = None
         self._all_grid_squares: List[GridSquare] = []
+        self._pixmaps = _PixmapCache(_ATLAS_SIZE, _ATLAS_PIXMAP_CACHE_SIZE)
+        self._tile_pixmaps = _PixmapCache(_THUMBNAIL_SIZE, _ATLAS_PIXMAP_CACHE_SIZE)
+        self._plotted_data: Dict[str, np.ndarray] = {}
+        self._data_version = 0
+        self._drawn_view: Optional[tuple] = None
         self.project = ""
 
     def load(
@@ -678,76 +785,39 @@ class AtlasDisplay(ComponentTab):
     ):
         self._grid_square = grid_square
         self._all_grid_squares = all_grid_squares or []
-        if data_changed:
+        if data_changed and not _same_stats(self._data, self._plotted_data):
             self._update_atlas_stats()
+            self._plotted_data = self._data
+            self._data_version += 1
+        view = (
+            self.project,
+            epu_dir,
+            grid_square.grid_square_name if grid_square else None,
+            tuple(gs.grid_square_name for gs in self._all_grid_squares),
+            self._data_version,
+        )
+        if view == self._drawn_view:
+            return
         atlas_lbl = self._draw_atlas(
             epu_dir,
             grid_square=self._grid_square,
             all_grid_squares=self._all_grid_squares,
         )
         if atlas_lbl:
-            vbox = QVBoxLayout()
-            vbox.addWidget(atlas_lbl)
-            vbox.addStretch()
-            self.grid.addLayout(vbox, 0, 0)
-            if self._grid_square:
-                tile_lbl = self._draw_tile(self._grid_square, epu_dir)
-                vbox = QVBoxLayout()
-                vbox.addWidget(tile_lbl)
-                vbox.addWidget(self._atlas_stats)
-                vbox.addStretch()
-                self.grid.addLayout(vbox, 0, 1)
+            self._drawn_view = view
+            tile_lbl = (
+                self._draw_tile(self._grid_square, epu_dir)
+                if self._grid_square
+                else None
+            )
+            if not tile_lbl:
+                self._tile_lbl.update_overlay(None, None, (0, 0), None)
+                self._tile_lbl.clear()
 
     def _update_atlas_stats(self):
-        atlas_fig = Figure(tight_layout=True)
-        atlas_fig.set_facecolor("gray")
-        self._atlas_stats_fig = atlas_fig.add_subplot(111)
-        self._atlas_stats_fig.set_facecolor("silver")
-        self._atlas_stats = InteractivePlot(atlas_fig)
-        try:
-            if self._colour_bar:
-                self._colour_bar.remove()
-        except (AttributeError, ValueError):
-            pass
-        if len(self._data.keys()) == 1:
-            self._atlas_stats.set_data(list(self._data.values())[0])
-            self._atlas_stats_fig.hist(
-                list(self._data.values())[0], color="darkturquoise"
-            )
-            self._atlas_stats_fig.axes.set_xlabel(list(self._data.keys())[0])
-        if len(self._data.keys()) == 2:
-            labels = []
-            data = []
-            for k, v in self._data.items():
-                labels.append(k)
-                data.append(v)
-            self._atlas_stats.set_data(data)
-            self._atlas_stats_fig.scatter(data[0], data[1], color="darkturquoise")
-            self._atlas_stats_fig.axes.set_xlabel(labels[0])
-            self._atlas_stats_fig.axes.set_ylabel(labels[1])
-        if len(self._data.keys()) > 2:
-            labels = []
-            data = []
-            for k, v in self._data.items():
-                labels.append(k)
-                data.append(list(v))
-            corr = np.corrcoef(data)
-            mat = self._atlas_stats_fig.matshow(corr)
-            ticks_loc = (
-                self._atlas_stats_fig.axes.get_xticks(),
-                self._atlas_stats_fig.axes.get_yticks(),
-            )
-            self._atlas_stats.set_data(corr)
-            self._atlas_stats_fig.xaxis.set_major_locator(
-                mticker.FixedLocator(ticks_loc[0][1:-1])
-            )
-            self._atlas_stats_fig.yaxis.set_major_locator(
-                mticker.FixedLocator(ticks_loc[1][1:-1])
-            )
-            self._atlas_stats_fig.axes.set_xticklabels(labels, rotation=45)
-            self._atlas_stats_fig.axes.set_yticklabels(labels)
-            self._colour_bar = self._atlas_stats_fig.figure.colorbar(mat)
-        self._atlas_stats.draw()
+        self._colour_bar = _draw_stats(
+            self._atlas_stats, self._atlas_stats_fig, self._data, self._colour_bar
+        )
 
     def _draw_atlas(
         self,
@@ -763,48 +833,40 @@ class AtlasDisplay(ComponentTab):
         elif _atlases:
             _atlas = _atlases[0]
         if _atlas:
-            atlas_pixmap = QPixmap(_atlas.thumbnail)
-            if flip != (1, 1):
-                atlas_pixmap = atlas_pixmap.transformed(QTransform().scale(*flip))
+            atlas_pixmap = self._pixmaps.get(_atlas.thumbnail, flip=flip)
             if grid_square:
-                imvs: Optional[list] = None
-                if (
-                    self._data
-                    and grid_square
-                    and all_grid_squares
-                    and len(self._data.keys()) == 1
-                ):
-                    imvs = [
-                        list(self._grid_square_averages.values())[0].get(
-                            gs.grid_square_name
-                        )
-                        for gs in all_grid_squares
-                        if gs != grid_square
-                    ]
-                    imvs = list(np.nan_to_num(imvs))
+                with_values = bool(
+                    self._data and all_grid_squares and len(self._data) == 1
+                )
+                averages: Dict[str, float] = (
+                    next(iter(self._grid_square_averages.values()))
+                    if with_values
+                    else {}
+                )
+                extra_images = []
+                values = []
+                for gs in all_grid_squares or []:
+                    if gs is grid_square:
+                        continue
+                    extra_images.append(gs)
+                    if with_values:
+                        values.append(averages.get(gs.grid_square_name, np.nan))
+                imvs = np.array(values, dtype=float) if with_values else None
+                value = averages.get(grid_square.grid_square_name) if values else None
                 qsize = atlas_pixmap.size()
-                atlas_lbl = ImageLabel(
+                self._atlas_lbl.update_overlay(
                     _atlas,
                     grid_square,
                     (qsize.width(), qsize.height()),
                     epu_dir,
-                    parent=self,
-                    overwrite_readout=True,
-                    value=list(self._grid_square_averages.values())[0].get(
-                        grid_square.grid_square_name
-                    )
-                    if imvs
-                    else None,
-                    extra_images=[gs for gs in all_grid_squares if gs != grid_square]
-                    if all_grid_squares
-                    else [],
+                    value=value,
+                    extra_images=extra_images,
                     image_values=imvs,
                 )
-                atlas_lbl.setPixmap(atlas_pixmap)
             else:
-                atlas_lbl = QLabel(self)
-                atlas_lbl.setPixmap(atlas_pixmap)
-            return atlas_lbl
+                self._atlas_lbl.update_overlay(_atlas, None, (0, 0), epu_dir)
+            self._atlas_lbl.setPixmap(atlas_pixmap)
+            return self._atlas_lbl
         return None
 
     def _draw_tile(
@@ -815,17 +877,11 @@ class AtlasDisplay(ComponentTab):
             project=self.project,
         )
         if _tile:
-            tile_pixmap = QPixmap(_tile.thumbnail)
-            if flip != (1, 1):
-                tile_pixmap = tile_pixmap.transformed(QTransform().scale(*flip))
+            tile_pixmap = self._tile_pixmaps.get(_tile.thumbnail, flip=flip)
             qsize = tile_pixmap.size()
-            tile_lbl = ImageLabel(
-                _tile,
-                grid_square,
-                (qsize.width(), qsize.height()),
-                epu_dir,
-                parent=self,
+            self._tile_lbl.update_overlay(
+                _tile, grid_square, (qsize.width(), qsize.height()), epu_dir
             )
-            tile_lbl.setPixmap(tile_pixmap)
-            return tile_lbl
+            self._tile_lbl.setPixmap(tile_pixmap)
+            return self._tile_lbl
         return None
@@ -1,31 +1,68 @@
-import math
+from functools import lru_cache
 from itertools import cycle
 from pathlib import Path
 from typing import List, Optional, Tuple, Union
 
 import matplotlib
-import mrcfile
 import numpy as np
 from PyQt5 import QtCore
-from PyQt5.QtGui import QBrush, QColor, QPainter, QPen
+from PyQt5.QtGui import QBrush, QColor, QPainter, QPainterPath, QPen
 from PyQt5.QtWidgets import QComboBox, QLabel
 
 from smartem.data_model import Atlas, Exposure, FoilHole, GridSquare, Particle, Tile
-from smartem.stage_model import find_point_pixel
+from smartem.stage_model import find_point_pixels
+
+_LOW_RGB = np.array(matplotlib.colors.to_rgb("#EF3054"))
+_HIGH_RGB = np.array(matplotlib.colors.to_rgb("#47682C"))
+
+
+def _gradient_rgb(values: Union[float, np.ndarray]) -> np.ndarray:
+    values = np.asarray(values, dtype=float)[..., np.newaxis]
+    return (1 - values) * _LOW_RGB + values * _HIGH_RGB
+
+
+_PARTICLE_DIAMETER = 30
+_GRADIENT_LEVELS = 256
+_RGB_LUT = np.rint(255 * _gradient_rgb(np.linspace(0, 1, _GRADIENT_LEVELS))).astype(
+    np.uint8
+)
+_HEX_LUT = ["#%02x%02x%02x" % tuple(c) for c in _RGB_LUT.tolist()]
+
+
+def _gradient_index(values: Union[float, np.ndarray]) -> np.ndarray:
+    values = np.clip(np.asarray(values, dtype=float), 0, 1)
+    return np.rint(values * (_GRADIENT_LEVELS - 1)).astype(int)
 
 
 def colour_gradient(value: float) -> str:
-    low = "#EF3054"
-    high = "#47682C"
-    low_rgb = np.array(matplotlib.colors.to_rgb(low))
-    high_rgb = np.array(matplotlib.colors.to_rgb(high))
-    return matplotlib.colors.to_hex((1 - value) * low_rgb + value * high_rgb)
+    return _HEX_LUT[int(_gradient_index(value))]
+
+
+def mrc_shape(mrc_path: Path) -> Tuple[int, ...]:
+    import mrcfile
+
+    with mrcfile.open(mrc_path, header_only=True, permissive=True) as mrc:
+        nz, ny, nx = int(mrc.header.nz), int(mrc.header.ny), int(mrc.header.nx)
+    return (ny, nx) if nz == 1 else (nz, ny, nx)
+
+
+@lru_cache(maxsize=_GRADIENT_LEVELS + 1)
+def _overlay_brush(colour_index: Optional[int] = None) -> QBrush:
+    if colour_index is None:
+        return QBrush()
+    r, g, b = _RGB_LUT[colour_index].tolist()
+    return QBrush(QColor(r, g, b, 150), QtCore.Qt.SolidPattern)
+
+
+@lru_cache(maxsize=32)
+def _cached_mrc_shape(mrc_path: Path, mtime_ns: int) -> Tuple[int, ...]:
+    return mrc_shape(mrc_path)
 
 
 class ParticleImageLabel(QLabel):
     def __init__(
         self,
-        image: Exposure,
+        image: Optional[Exposure],
         particles: Union[List[Particle], List[List[Particle]]],
         image_size: Tuple[int, int],
         image_scale: float = 0.5,
@@ -33,35 +70,51 @@ class ParticleImageLabel(QLabel):
         **kwargs,
     ):
         super().__init__(**kwargs)
+        self._selection_box = selection_box
+        self.update_particles(image, particles, image_size, image_scale=image_scale)
+
+    def update_particles(
+        self,
+        image: Optional[Exposure],
+        particles: Union[List[Particle], List[List[Particle]]],
+        image_size: Tuple[int, int],
+        image_scale: float = 0.5,
+    ):
         self._image = image
         self._image_size = image_size
         self._particles = particles
         self._image_scale = image_scale
-        self._selection_box = selection_box
+        self._particle_scale: Optional[np.ndarray] = None
+        if image and image.readout_area_x and image.readout_area_y:
+            self._particle_scale = image_scale * np.array(
+                [
+                    image_size[0] / image.readout_area_x,
+                    image_size[1] / image.readout_area_y,
+                ]
+            )
+        if particles and isinstance(particles[0], Particle):
+            self._particle_paths = [self._particle_path(particles)]
+        else:
+            self._particle_paths = [self._particle_path(group) for group in particles]
+        self.update()
+
+    def _particle_path(self, particles: List[Particle]) -> QPainterPath:
+        path = QPainterPath()
+        if self._particle_scale is None or not particles:
+            return path
+        coordinates = np.array([(p.x, p.y) for p in particles], dtype=float)
+        corners = (coordinates * self._particle_scale - _PARTICLE_DIAMETER / 2).astype(
+            int
+        )
+        for x, y in corners.tolist():
+            path.addEllipse(x, y, _PARTICLE_DIAMETER, _PARTICLE_DIAMETER)
+        return path
 
     def mousePressEvent(self, ev):
         if self._selection_box is not None:
             self._selection_box.setFocus()
             self._selection_box.activateWindow()
 
-    def draw_circle(
-        self, coordinates: Tuple[float, float], diameter: int, painter: QPainter
-    ):
-        if self._image.readout_area_x and self._image.readout_area_y:
-            x = (
-                coordinates[0]
-                * self._image_scale
-                * (self._image_size[0] / self._image.readout_area_x)
-                - diameter / 2
-            )
-            y = (
-                coordinates[1]
-                * self._image_scale
-                * (self._image_size[1] / self._image.readout_area_y)
-                - diameter / 2
-            )
-            painter.drawEllipse(int(x), int(y), diameter, diameter)
-
     def paintEvent(self, e):
         super().paintEvent(e)
 
@@ -80,15 +133,13 @@ class ParticleImageLabel(QLabel):
         )
 
         if self._particles and isinstance(self._particles[0], Particle):
-            for particle in self._particles:
-                self.draw_circle((particle.x, particle.y), 30, painter)
+            painter.drawPath(self._particle_paths[0])
         elif self._particles:
-            for particle_group in self._particles:
+            for path in self._particle_paths:
                 pen = QPen(next(colour_cycle))
                 pen.setWidth(3)
                 painter.setPen(pen)
-                for particle in particle_group:
-                    self.draw_circle((particle.x, particle.y), 30, painter)
+                painter.drawPath(path)
 
         painter.end()
 
@@ -96,178 +147,206 @@ class ParticleImageLabel(QLabel):
 class ImageLabel(QLabel):
     def __init__(
         self,
-        image: Union[Atlas, Tile, GridSquare, FoilHole, Exposure],
+        image: Optional[Union[Atlas, Tile, GridSquare, FoilHole, Exposure]],
         contained_image: Optional[Union[GridSquare, FoilHole, Exposure]],
         image_size: Tuple[int, int],
-        image_directory: Path,
+        image_directory: Optional[Path],
         overwrite_readout: bool = False,
         value: Optional[float] = None,
         extra_images: Optional[list] = None,
-        image_values: Optional[List[float]] = None,
+        image_values: Optional[Union[List[Optional[float]], np.ndarray]] = None,
         selection_box: Optional[QComboBox] = None,
         **kwargs,
     ):
         super().__init__(**kwargs)
+        self._overwrite_readout = overwrite_readout
+        self._selection_box = selection_box
+        self.update_overlay(
+            image,
+            contained_image,
+            image_size,
+            image_directory,
+            value=value,
+            extra_images=extra_images,
+            image_values=image_values,
+        )
+
+    def update_overlay(
+        self,
+        image: Optional[Union[Atlas, Tile, GridSquare, FoilHole, Exposure]],
+        contained_image: Optional[Union[GridSquare, FoilHole, Exposure]],
+        image_size: Tuple[int, int],
+        image_directory: Optional[Path],
+        value: Optional[float] = None,
+        extra_images: Optional[list] = None,
+        image_values: Optional[Union[List[Optional[float]], np.ndarray]] = None,
+    ):
         self._image = image
         self._image_directory = image_directory
         self._contained_image = contained_image
         self._extra_images = extra_images or []
         self._image_size = image_size
-        self._overwrite_readout = overwrite_readout
         self._value = value
-        self._image_values = image_values or []
-        self._selection_box = selection_box
+        self._image_values = np.asarray(
+            image_values if image_values is not None else [], dtype=float
+        )
+        self._rects: Optional[Tuple[List[List[int]], Optional[List[int]]]] = None
+        self._mrc_path: Optional[Path] = None
+        if self._overwrite_readout and image is not None and image_directory:
+            self._mrc_path = (image_directory / image.thumbnail).with_suffix(".mrc")
+        self._normalise_values()
+        self._extra_geometry()
+        self._extra_colours = self._extra_colour_indices()
+        self.update()
 
-    def mousePressEvent(self, ev):
-        if self._selection_box is not None:
-            self._selection_box.setFocus()
-            self._selection_box.activateWindow()
+    def _extra_geometry(self):
+        self._extra_indices: List[int] = []
+        geometry = []
+        for i, im in enumerate(self._extra_images):
+            if not im.thumbnail:
+                continue
+            self._extra_indices.append(i)
+            geometry.append(
+                (
+                    im.stage_position_x,
+                    im.stage_position_y,
+                    im.readout_area_x * im.pixel_size,
+                    im.readout_area_y * im.pixel_size,
+                )
+            )
+        geometry_array = np.array(geometry, dtype=float).reshape(-1, 4)
+        self._extra_positions = geometry_array[:, :2]
+        self._extra_extents = geometry_array[:, 2:]
+
+    def _readout_area(self) -> Tuple[int, ...]:
+        if self._mrc_path is not None:
+            return _cached_mrc_shape(self._mrc_path, self._mrc_path.stat().st_mtime_ns)
+        return (self._image.readout_area_x, self._image.readout_area_y)
 
-    def draw_rectangle(
+    def _inner_rects(
         self,
-        inner_image: Union[GridSquare, FoilHole, Exposure],
-        readout_area: Tuple[int, int],
+        positions: np.ndarray,
+        extents: np.ndarray,
+        outer_size: Tuple[int, int],
         scaled_pixel_size: float,
-        painter: QPainter,
-        normalised_value: Optional[float] = None,
-    ):
-        if normalised_value is not None:
-            c = QColor()
-            rgb = (
-                int(255 * x)
-                for x in matplotlib.colors.to_rgb(colour_gradient(normalised_value))
-            )
-            c.setRgb(*rgb, alpha=150)
-            brush = QBrush(c, QtCore.Qt.SolidPattern)
-            painter.setBrush(brush)
-        else:
-            brush = QBrush()
-            painter.setBrush(brush)
-        if inner_image.thumbnail:
-            rect_centre = find_point_pixel(
-                (
-                    inner_image.stage_position_x,
-                    inner_image.stage_position_y,
-                ),
-                (self._image.stage_position_x, self._image.stage_position_y),
-                scaled_pixel_size,
-                (
-                    int(readout_area[0] / (scaled_pixel_size / self._image.pixel_size)),
-                    int(readout_area[1] / (scaled_pixel_size / self._image.pixel_size)),
-                ),
-                xfactor=1,
-                yfactor=-1,
-            )
-            edge_lengths = (
-                int(
-                    inner_image.readout_area_x
-                    * inner_image.pixel_size
-                    / scaled_pixel_size
+    ) -> np.ndarray:
+        centres = find_point_pixels(
+            positions,
+            (self._image.stage_position_x, self._image.stage_position_y),
+            scaled_pixel_size,
+            outer_size,
+            xfactor=1,
+            yfactor=-1,
+        )
+        edge_lengths = (extents / scaled_pixel_size).astype(int)
+        corners = (centres - 0.5 * edge_lengths).astype(int)
+        return np.hstack([corners, edge_lengths])
+
+    def _overlay_rects(self) -> Tuple[List[List[int]], Optional[List[int]]]:
+        if self._rects is not None:
+            return self._rects
+        readout_area = self._readout_area()
+        scaled_pixel_size = self._image.pixel_size * (
+            readout_area[0] / self._image_size[0]
+        )
+        ratio = scaled_pixel_size / self._image.pixel_size
+        outer_size = (int(readout_area[0] / ratio), int(readout_area[1] / ratio))
+        extra_rects = self._inner_rects(
+            self._extra_positions, self._extra_extents, outer_size, scaled_pixel_size
+        ).tolist()
+        contained_rect = None
+        if self._contained_image.thumbnail:
+            contained_rect = self._inner_rects(
+                np.array(
+                    [
+                        [
+                            self._contained_image.stage_position_x,
+                            self._contained_image.stage_position_y,
+                        ]
+                    ],
+                    dtype=float,
                 ),
-                int(
-                    inner_image.readout_area_y
-                    * inner_image.pixel_size
-                    / scaled_pixel_size
+                np.array(
+                    [
+                        [
+                            self._contained_image.readout_area_x
+                            * self._contained_image.pixel_size,
+                            self._contained_image.readout_area_y
+                            * self._contained_image.pixel_size,
+                        ]
+                    ],
+                    dtype=float,
                 ),
-            )
-            painter.drawRect(
-                int(rect_centre[0] - 0.5 * edge_lengths[0]),
-                int(rect_centre[1] - 0.5 * edge_lengths[1]),
-                edge_lengths[0],
-                edge_lengths[1],
-            )
+                outer_size,
+                scaled_pixel_size,
+            ).tolist()[0]
+        self._rects = (extra_rects, contained_rect)
+        return self._rects
+
+    def _normalise_values(self):
+        self._colours: Optional[np.ndarray] = None
+        self._finite: Optional[np.ndarray] = None
+        self._norm_value = 0.0
+        if not self._image_values.size:
+            return
+        values = np.append(
+            self._image_values, np.nan if self._value is None else self._value
+        )
+        finite = np.isfinite(values)
+        if not finite.any():
+            return
+        finite_values = values[finite]
+        min_value = finite_values.min()
+        value_range = float(finite_values.max() - min_value) or 1.0
+        normalised = (values - min_value) / value_range
+        self._finite = finite[:-1]
+        self._colours = _gradient_index(np.where(finite, normalised, 0)[:-1])
+        if finite[-1]:
+            self._norm_value = float(normalised[-1])
+
+    def _extra_colour_indices(self) -> List[Optional[int]]:
+        if self._colours is None:
+            return [None] * len(self._extra_indices)
+        drawn = np.array(self._extra_indices, dtype=int)
+        colours = self._colours[drawn].tolist()
+        finite = self._finite[drawn].tolist()
+        return [c if f else None for c, f in zip(colours, finite)]
+
+    def mousePressEvent(self, ev):
+        if self._selection_box is not None:
+            self._selection_box.setFocus()
+            self._selection_box.activateWindow()
+
+    def _set_brush(self, painter: QPainter, colour_index: Optional[int] = None):
+        painter.setBrush(_overlay_brush(colour_index))
 
     def paintEvent(self, e):
         super().paintEvent(e)
 
         if self._contained_image:
+            if self._image_values.size and self._colours is None:
+                return
+            extra_rects, contained_rect = self._overlay_rects()
+
             painter = QPainter(self)
             pen = QPen(QColor(QtCore.Qt.blue))
             pen.setWidth(3)
             painter.setPen(pen)
-            if self._overwrite_readout:
-                with mrcfile.open(
-                    (self._image_directory / self._image.thumbnail).with_suffix(".mrc")
-                ) as mrc:
-                    readout_area = mrc.data.shape
-            else:
-                readout_area = (self._image.readout_area_x, self._image.readout_area_y)
-            scaled_pixel_size = self._image.pixel_size * (
-                readout_area[0] / self._image_size[0]
-            )
 
-            if self._image_values:
-                try:
-                    min_value = min(
-                        imv
-                        for imv in self._image_values + [self._value]
-                        if imv is not None
-                        and not math.isnan(imv)
-                        and not math.isinf(imv)
-                    )
-                # catch when an empty sequence is passed to min
-                except ValueError:
-                    return
-                shifted = [
-                    iv - min_value
-                    if iv is not None and not math.isnan(iv) and not math.isinf(iv)
-                    else None
-                    for iv in self._image_values
-                ]
-                all_shifted = [
-                    iv - min_value
-                    if iv is not None and not math.isnan(iv) and not math.isinf(iv)
-                    else None
-                    for iv in self._image_values + [self._value]
-                ]
-                maxv = max(
-                    abs(imv)
-                    for imv in all_shifted
-                    if imv is not None and not math.isnan(imv) and not math.isinf(imv)
-                )
-                if maxv:
-                    normalised = [
-                        s / maxv
-                        if s is not None and not math.isnan(s) and not math.isinf(s)
-                        else None
-                        for s in shifted
-                    ]
-                else:
-                    normalised = shifted
-            for i, im in enumerate(self._extra_images):
-                if self._image_values:
-                    self.draw_rectangle(
-                        im,
-                        readout_area,
-                        scaled_pixel_size,
-                        painter,
-                        normalised_value=normalised[i],
-                    )
-                else:
-                    self.draw_rectangle(im, readout_area, scaled_pixel_size, painter)
+            for colour_index, rect in zip(self._extra_colours, extra_rects):
+                self._set_brush(painter, colour_index=colour_index)
+                painter.drawRect(*rect)
 
             pen = QPen(QColor(QtCore.Qt.red))
             pen.setWidth(3)
             painter.setPen(pen)
-
-            if self._value is not None and self._image_values:
-                norm_value = (self._value - min_value) / maxv
-            else:
-                norm_value = 0
-
-            norm_value = np.nan_to_num(norm_value)
-
-            if self._value is not None:
-                self.draw_rectangle(
-                    self._contained_image,
-                    readout_area,
-                    scaled_pixel_size,
-                    painter,
-                    normalised_value=norm_value,
-                )
-            else:
-                self.draw_rectangle(
-                    self._contained_image, readout_area, scaled_pixel_size, painter
-                )
+            self._set_brush(
+                painter,
+                colour_index=None
+                if self._value is None
+                else int(_gradient_index(self._norm_value)),
+            )
+            if contained_rect is not None:
+                painter.drawRect(*contained_rect)
 
             painter.end()
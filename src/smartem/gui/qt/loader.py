@@ -1,7 +1,8 @@
+import os
 from concurrent.futures import ThreadPoolExecutor
 from functools import lru_cache
 from pathlib import Path
-from typing import Dict, Generator, List, Optional
+from typing import Dict, Generator, Iterator, List, Optional
 
 from PyQt5.QtWidgets import (
     QComboBox,
@@ -25,19 +26,50 @@ from smartem.parsing.star import (
     open_star_file,
 )
 
+_ignored_path_parts = ("gui", "pipeline", "Nodes", "NODES")
+
+
+def _ignored(name: str) -> bool:
+    return any(p in name for p in _ignored_path_parts)
+
+
+def _iter_star_files(directory: Path) -> Iterator[str]:
+    if _ignored(str(directory)):
+        return
+    with os.scandir(directory) as job_types:
+        job_type_dirs = [
+            jt.path for jt in job_types if not _ignored(jt.name) and jt.is_dir()
+        ]
+    for job_type_dir in job_type_dirs:
+        with os.scandir(job_type_dir) as jobs:
+            job_dirs = [
+                j.path
+                for j in jobs
+                if not _ignored(j.name) and not j.is_symlink() and j.is_dir()
+            ]
+        for job_dir in job_dirs:
+            with os.scandir(job_dir) as files:
+                for f in files:
+                    if (
+                        f.name.endswith(".star")
+                        and "job" not in f.name
+                        and not _ignored(f.name)
+                    ):
+                        yield f.path
+
+
+@lru_cache(maxsize=4)
+def _open_star_file(star_file_path: str, mtime: float):
+    return open_star_file(Path(star_file_path))
+
+
+def _cached_star_file(star_file_path: Path):
+    return _open_star_file(str(star_file_path), os.stat(star_file_path).st_mtime)
+
 
 @lru_cache(maxsize=5)
 def relevant_star_files(directory: Path) -> List[str]:
-    sfiles = []
-    for sf in directory.glob("*/*/*.star"):
-        str_sf = str(sf)
-        if (
-            all(p not in str_sf for p in ("gui", "pipeline", "Nodes", "NODES"))
-            and "job" not in sf.name
-            and not sf.parent.is_symlink()
-        ):
-            sfiles.append(str_sf)
-    return sfiles
+    return list(_iter_star_files(directory))
 
 
 def _string_to_glob(glob_string: str) -> Generator[Path, None, None]:
@@ -120,23 +152,26 @@ class StarDataLoader(ComponentTab):
         else:
             star_file_path = Path(self._file_combo.currentText())
         try:
-            star_file = open_star_file(star_file_path)
+            star_file = _cached_star_file(star_file_path)
         except (OSError, ValueError):
             print(f"Could not open star file {star_file_path}")
             return
         if not column_combos:
             column_combos = [self._column_combo]
         columns = get_columns(star_file, ignore=["pipeline"])
-        for combo in column_combos:
+        column_names = sorted(set(columns))
+        items = [""] + column_names
+        for i, combo in enumerate(column_combos):
+            combo.blockSignals(True)
             combo.clear()
-            combo.addItem("")
-        for c in sorted(set(columns)):
-            for i, combo in enumerate(column_combos):
-                combo.addItem(c)
-                if defaults and c == defaults[i]:
-                    combo.setCurrentText(c)
-                    if connections and connections.get(defaults[i]):
-                        setattr(self, connections[defaults[i]], c)
+            combo.addItems(items)
+            combo.blockSignals(False)
+            if defaults and defaults[i] in column_names:
+                combo.setCurrentText(defaults[i])
+                if connections and connections.get(defaults[i]):
+                    setattr(self, connections[defaults[i]], defaults[i])
+            else:
+                combo.currentIndexChanged.emit(combo.currentIndex())
 
     def _select_column(self, index: int):
         self._column = self._column_combo.currentText()
@@ -192,7 +227,7 @@ class ExposureDataLoader(StarDataLoader):
 
     def _insert_from_star_file(self, star_file_path: Path):
         if self._exposure_tag:
-            star_file = open_star_file(star_file_path)
+            star_file = _cached_star_file(star_file_path)
             column_data = get_column_data(
                 star_file, [self._exposure_tag, self._column], "micrographs"
             )
@@ -289,7 +324,7 @@ class ParticleDataLoader(ExposureDataLoader):
     def _insert_from_star_file(
         self, star_file_path: Path, just_particles: bool = False
     ):
-        star_file = open_star_file(star_file_path)
+        star_file = _cached_star_file(star_file_path)
         if self._exposure_tag:
             if just_particles:
                 column_data = get_column_data(
@@ -416,33 +451,29 @@ class ParticleSetDataLoader(ParticleDataLoader):
         self._file_combo.clear()
         self._cross_ref_file_combo.clear()
         self._cross_ref_file_combo.addItem("")
-        for sf in self._proj_dir.glob("*/*/*.star"):
-            str_sf = str(sf)
-            if (
-                all(p not in str_sf for p in ("gui", "pipeline", "Nodes", "NODES"))
-                and "job" not in sf.name
-                and not sf.parent.is_symlink()
-            ):
-                self._file_combo.addItem(str_sf)
-                self._cross_ref_file_combo.addItem(str_sf)
+        star_files = list(_iter_star_files(self._proj_dir))
+        self._file_combo.addItems(star_files)
+        self._cross_ref_file_combo.addItems(star_files)
+
+    def _set_cross_ref_columns(self, columns: List[str]):
+        column_names = sorted(set(columns))
+        self._cross_ref_combo.clear()
+        self._cross_ref_combo.addItems(column_names)
+        if "_rlnreferenceimage" in column_names:
+            self._cross_ref_combo.setCurrentText("_rlnreferenceimage")
+        self._column_combo.clear()
+        self._column_combo.addItems(column_names)
 
     def _select_cross_ref_file(self):
         if self._cross_ref_file_combo.currentText():
             self._cross_ref_combo.setEnabled(True)
             star_file_path = Path(self._cross_ref_file_combo.currentText())
             try:
-                star_file = open_star_file(star_file_path)
+                star_file = _cached_star_file(star_file_path)
             except (OSError, ValueError):
                 print(f"Could not open star file {star_file_path}")
                 return
-            columns = get_columns(star_file, ignore=["pipeline"])
-            self._cross_ref_combo.clear()
-            self._column_combo.clear()
-            for c in sorted(set(columns)):
-                self._cross_ref_combo.addItem(c)
-                if c == "_rlnreferenceimage":
-                    self._cross_ref_combo.setCurrentText(c)
-                self._column_combo.addItem(c)
+            self._set_cross_ref_columns(get_columns(star_file, ignore=["pipeline"]))
 
     def _select_set_id_tag(self, index: int):
         self._set_id_tag = self._set_id_combo.currentText()
@@ -482,17 +513,10 @@ class ParticleSetDataLoader(ParticleDataLoader):
             )
             star_file_path = Path(self._cross_ref_file_combo.currentText())
             try:
-                star_file = open_star_file(star_file_path)
+                star_file = _cached_star_file(star_file_path)
             except (OSError, ValueError):
                 return
-            columns = get_columns(star_file, ignore=["pipeline"])
-            self._cross_ref_combo.clear()
-            self._column_combo.clear()
-            for c in sorted(set(columns)):
-                self._cross_ref_combo.addItem(c)
-                if c == "_rlnreferenceimage":
-                    self._cross_ref_combo.setCurrentText(c)
-                self._column_combo.addItem(c)
+            self._set_cross_ref_columns(get_columns(star_file, ignore=["pipeline"]))
         else:
             super()._select_star_file(
                 index,
@@ -528,7 +552,7 @@ class ParticleSetDataLoader(ParticleDataLoader):
             data_api = None
         if self._exposure_tag and self._column:
             if cross_ref_file_path:
-                star_file = open_star_file(star_file_path)
+                star_file = _cached_star_file(star_file_path)
                 column_data = get_column_data(
                     star_file,
                     [
@@ -540,7 +564,7 @@ class ParticleSetDataLoader(ParticleDataLoader):
                     ],
                     "particles",
                 )
-                cross_ref_file = open_star_file(cross_ref_file_path)
+                cross_ref_file = _cached_star_file(cross_ref_file_path)
                 cross_ref_column_data = get_column_data(
                     cross_ref_file,
                     [self._cross_ref_combo.currentText(), self._column],
@@ -553,15 +577,14 @@ class ParticleSetDataLoader(ParticleDataLoader):
                             while _elem.startswith("0"):
                                 _elem = _elem[1:]
                             v[i] = _elem
-                cross_ref_dict = {}
-                for i, k02 in enumerate(column_data[self._set_id_tag]):
-                    for j, k01 in enumerate(
-                        cross_ref_column_data[self._cross_ref_combo.currentText()]
-                    ):
-                        if k01 == str(k02):
-                            cross_ref_dict[i] = cross_ref_column_data[self._column][j]
+                cross_ref_dict = dict(
+                    zip(
+                        cross_ref_column_data[self._cross_ref_combo.currentText()],
+                        cross_ref_column_data[self._column],
+                    )
+                )
                 column_data[self._column] = [
-                    cross_ref_dict[i] for i in range(len(column_data[self._set_id_tag]))
+                    cross_ref_dict[str(k02)] for k02 in column_data[self._set_id_tag]
                 ]
                 insert_particle_set(
                     column_data,
@@ -576,7 +599,7 @@ class ParticleSetDataLoader(ParticleDataLoader):
                     add_source_to_id=True,
                 )
             else:
-                star_file = open_star_file(star_file_path)
+                star_file = _cached_star_file(star_file_path)
                 column_data = get_column_data(
                     star_file,
                     [
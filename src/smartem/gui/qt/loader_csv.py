@@ -88,9 +88,7 @@ class CSVDataLoader(ComponentTab):
     @background(children=None)
     def _set_project_directory(self, project_directory: Path):
         self._proj_dir = project_directory
-        for sf in self._proj_dir.glob("*/*/*.csv"):
-            str_sf = str(sf)
-            self._file_combo.addItem(str_sf)
+        self._file_combo.addItems([str(sf) for sf in self._proj_dir.glob("*/*/*.csv")])
 
     def _insert_from_csv_file(self, csv_file_path: Path):
         if self._exposure_tag and self._column:
@@ -123,16 +121,19 @@ class CSVDataLoader(ComponentTab):
             reader = csv.DictReader(csv_file)
             columns = list(next(reader).keys())
         column_combos = [self._column_combo, self._exposure_tag_combo]
-        for combo in column_combos:
+        column_names = sorted(set(columns))
+        items = [""] + column_names
+        for i, combo in enumerate(column_combos):
+            combo.blockSignals(True)
             combo.clear()
-            combo.addItem("")
-        for c in sorted(set(columns)):
-            for i, combo in enumerate(column_combos):
-                combo.addItem(c)
-                if defaults and c == defaults[i]:
-                    combo.setCurrentText(c)
-                    if connections and connections.get(defaults[i]):
-                        setattr(self, connections[defaults[i]], c)
+            combo.addItems(items)
+            combo.blockSignals(False)
+            if defaults and defaults[i] in column_names:
+                combo.setCurrentText(defaults[i])
+                if connections and connections.get(defaults[i]):
+                    setattr(self, connections[defaults[i]], defaults[i])
+            else:
+                combo.currentIndexChanged.emit(combo.currentIndex())
 
     def _select_column(self, index: int):
         self._column = self._column_combo.currentText()
@@ -1,5 +1,5 @@
 from pathlib import Path
-from typing import Any, Dict, Tuple
+from typing import Any, Dict, List, Tuple
 
 import xmltodict
 
@@ -80,28 +80,27 @@ def parse_epu_version(epu_path: Path) -> Tuple[str, str]:
 
 
 def parse_epu_dir(epu_path: Path, extractor: DataAPI, project: str):
-    exposures = {}
+    grid_squares: List[GridSquare] = []
+    all_foil_holes: Dict[str, FoilHole] = {}
+    exposures: Dict[str, Exposure] = {}
     for grid_square_dir in epu_path.glob("GridSquare*"):
         if grid_square_dir.is_dir():
             foil_holes: Dict[str, FoilHole] = {}
-            afis_foil_holes: Dict[str, FoilHole] = {}
             grid_square_jpeg = next(grid_square_dir.glob("*.jpg"))
             grid_square_data = parse_epu_xml(grid_square_jpeg.with_suffix(".xml"))
             tile_id = extractor.get_tile_id(grid_square_data["stage_position"], project)
             if tile_id is not None:
-                extractor.put(
-                    [
-                        GridSquare(
-                            grid_square_name=grid_square_dir.name,
-                            stage_position_x=grid_square_data["stage_position"][0],
-                            stage_position_y=grid_square_data["stage_position"][1],
-                            thumbnail=str(grid_square_jpeg.relative_to(epu_path)),
-                            pixel_size=grid_square_data["pixel_size"],
-                            readout_area_x=grid_square_data["readout_area"][0],
-                            readout_area_y=grid_square_data["readout_area"][1],
-                            tile_id=tile_id,
-                        )
-                    ]
+                grid_squares.append(
+                    GridSquare(
+                        grid_square_name=grid_square_dir.name,
+                        stage_position_x=grid_square_data["stage_position"][0],
+                        stage_position_y=grid_square_data["stage_position"][1],
+                        thumbnail=str(grid_square_jpeg.relative_to(epu_path)),
+                        pixel_size=grid_square_data["pixel_size"],
+                        readout_area_x=grid_square_data["readout_area"][0],
+                        readout_area_y=grid_square_data["readout_area"][1],
+                        tile_id=tile_id,
+                    )
                 )
             for foil_hole_jpeg in (grid_square_dir / "FoilHoles").glob("FoilHole*.jpg"):
                 foil_hole_name = "_".join(foil_hole_jpeg.stem.split("_")[:2])
@@ -123,7 +122,7 @@ def parse_epu_dir(epu_path: Path, extractor: DataAPI, project: str):
                     readout_area_y=foil_hole_data["readout_area"][0],
                     foil_hole_name=foil_hole_name,
                 )
-            extractor.put(list(foil_holes.values()))
+            all_foil_holes.update(foil_holes)
             for exposure_jpeg in (grid_square_dir / "Data").glob("*.jpg"):
                 exposure_data = parse_epu_xml(exposure_jpeg.with_suffix(".xml"))
                 for fh_name in foil_holes.keys():
@@ -132,7 +131,7 @@ def parse_epu_dir(epu_path: Path, extractor: DataAPI, project: str):
                         break
                 else:
                     foil_hole_name = exposure_jpeg.name.split("_Data")[0]
-                    afis_foil_holes[foil_hole_name] = FoilHole(
+                    all_foil_holes[foil_hole_name] = FoilHole(
                         grid_square_name=grid_square_dir.name,
                         stage_position_x=exposure_data["stage_position"][0],
                         stage_position_y=exposure_data["stage_position"][1],
@@ -142,7 +141,7 @@ def parse_epu_dir(epu_path: Path, extractor: DataAPI, project: str):
                         readout_area_y=None,
                         foil_hole_name=foil_hole_name,
                     )
-                exposures[exposure_jpeg] = Exposure(
+                exposures[exposure_jpeg.name] = Exposure(
                     exposure_name=exposure_jpeg.name,
                     foil_hole_name=foil_hole_name,
                     stage_position_x=exposure_data["stage_position"][0],
@@ -152,5 +151,6 @@ def parse_epu_dir(epu_path: Path, extractor: DataAPI, project: str):
                     readout_area_x=exposure_data["readout_area"][0],
                     readout_area_y=exposure_data["readout_area"][1],
                 )
-            extractor.put(list(afis_foil_holes.values()))
-            extractor.put(list(exposures.values()))
+    extractor.put(grid_squares)
+    extractor.put(list(all_foil_holes.values()))
+    extractor.put(list(exposures.values()))
@@ -110,15 +110,14 @@ def _class2d(relion_dir: Path, data_handler: DataAPI, project: str):
                     while _elem.startswith("0"):
                         _elem = _elem[1:]
                     v[i] = _elem
-        cross_ref_dict = {}
-        for i, k02 in enumerate(column_data["_rlnclassnumber"]):
-            for j, k01 in enumerate(cross_ref_column_data["_rlnreferenceimage"]):
-                if k01 == str(k02):
-                    cross_ref_dict[i] = cross_ref_column_data[
-                        "_rlnestimatedresolution"
-                    ][j]
+        cross_ref_dict = dict(
+            zip(
+                cross_ref_column_data["_rlnreferenceimage"],
+                cross_ref_column_data["_rlnestimatedresolution"],
+            )
+        )
         column_data["_rlnestimatedresolution"] = [
-            cross_ref_dict[i] for i in range(len(column_data["_rlnclassnumber"]))
+            cross_ref_dict[str(k02)] for k02 in column_data["_rlnclassnumber"]
         ]
         insert_particle_set(
             column_data,
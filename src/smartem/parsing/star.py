@@ -1,7 +1,7 @@
 import json
 import os
 from pathlib import Path
-from typing import Dict, List, Optional
+from typing import Dict, List, Optional, Tuple
 
 from gemmi import cif
 
@@ -50,7 +50,7 @@ def insert_exposure_data(
     project: str = "",
 ):
     if validate:
-        exposures = [e.exposure_name for e in extractor.get_exposures(project=project)]
+        exposures = {e.exposure_name for e in extractor.get_exposures(project=project)}
     exposure_info: List[ExposureInfo] = []
     for k, v in data.items():
         if k != exposure_tag:
@@ -93,6 +93,7 @@ def _structure_particle_data(
     y_tag: str,
 ) -> Dict[str, Dict[str, list]]:
     structured_data: Dict[str, Dict[str, list]] = {}
+    exposure_names = set(exposures)
     for i, micrograph_path in enumerate(data[exposure_tag]):
         exposure_name = (
             Path(micrograph_path)
@@ -100,7 +101,7 @@ def _structure_particle_data(
             .replace("_Fractions", "")
             + ".jpg"
         )
-        if exposure_name in exposures:
+        if exposure_name in exposure_names:
             try:
                 structured_data[exposure_name]["coordinates"].append(
                     (data[x_tag][i], data[y_tag][i])
@@ -115,6 +116,15 @@ def _structure_particle_data(
     return structured_data
 
 
+def _new_particle_coords(
+    new_particles: List[Particle], new_particle_ids: list
+) -> Dict[str, Dict[Tuple[float, float], int]]:
+    particle_coords: Dict[str, Dict[Tuple[float, float], int]] = {}
+    for p, pid in zip(new_particles, new_particle_ids):
+        particle_coords.setdefault(p.exposure_name, {})[(p.x, p.y)] = pid.particle_id
+    return particle_coords
+
+
 def insert_particle_data(
     data: Dict[str, List[str]],
     exposure_tag: str,
@@ -158,13 +168,10 @@ def insert_particle_data(
 
     if new_particles:
         new_particle_ids = extractor.put(new_particles)
+        new_particle_coords = _new_particle_coords(new_particles, new_particle_ids)
         for exposure in exposures:
             if structured_data.get(exposure):
-                existing_particle_coords = {
-                    (p.x, p.y): pid.particle_id
-                    for p, pid in zip(new_particles, new_particle_ids)
-                    if p.exposure_name == exposure
-                }
+                existing_particle_coords = new_particle_coords.get(exposure, {})
                 for i, particle in enumerate(structured_data[exposure]["coordinates"]):
                     if existing_particle_coords.get(particle):
                         for k in extra_keys:
@@ -225,11 +232,7 @@ def insert_particle_set(
             ]
         extractor.put(particle_sets)
     else:
-        particle_sets = []
-        for set_id in set_ids:
-            for ps in _particle_sets:
-                if ps.identifier == set_id:
-                    particle_sets.append(ps)
+        particle_sets = [ps for ps in _particle_sets if ps.identifier in set_ids]
     exposures = [e.exposure_name for e in extractor.get_exposures(project=project)]
     structured_data = _structure_particle_data(
         data, exposures, exposure_tag, x_tag, y_tag
@@ -240,13 +243,13 @@ def insert_particle_set(
     linkers_for_new_particles = []
 
     if extra_keys:
-        for si in set_ids:
-            for i, s in enumerate(data[set_id_tag]):
-                if s == si:
-                    set_instances[si] = {
-                        k: float(v[i]) for k, v in data.items() if k in extra_keys
-                    }
-                    break
+        first_indices: Dict[str, int] = {}
+        for i, s in enumerate(data[set_id_tag]):
+            first_indices.setdefault(s, i)
+        for si, i in first_indices.items():
+            set_instances[si] = {
+                k: float(v[i]) for k, v in data.items() if k in extra_keys
+            }
 
     for exposure in exposures:
         if structured_data.get(exposure):
@@ -287,14 +290,11 @@ def insert_particle_set(
 
     if new_particles:
         new_particle_ids = extractor.put(new_particles)
+        new_particle_coords = _new_particle_coords(new_particles, new_particle_ids)
 
         for exposure in exposures:
             if structured_data.get(exposure):
-                particle_coords = {
-                    (p.x, p.y): pid.particle_id
-                    for p, pid in zip(new_particles, new_particle_ids)
-                    if p.exposure_name == exposure
-                }
+                particle_coords = new_particle_coords.get(exposure, {})
                 for i, particle in enumerate(structured_data[exposure]["coordinates"]):
                     if particle_coords.get(particle):
                         if add_source_to_id:
@@ -1,4 +1,6 @@
-from typing import Tuple
+from typing import Tuple, Union
+
+import numpy as np
 
 
 def find_point_pixel(
@@ -18,3 +20,16 @@ def find_point_pixel(
         outer_centre_pix[0] + xfactor * int(delta[0]),
         outer_centre_pix[1] + yfactor * int(delta[1]),
     )
+
+
+def find_point_pixels(
+    inner_pos: np.ndarray,
+    outer_centre: Union[Tuple[float, float], np.ndarray],
+    outer_spacing: Union[float, np.ndarray],
+    outer_size: Tuple[int, int],
+    xfactor: int = 1,
+    yfactor: int = 1,
+) -> np.ndarray:
+    delta = np.trunc((np.asarray(outer_centre) - inner_pos) / outer_spacing)
+    outer_centre_pix = np.array([outer_size[0] // 2, outer_size[1] // 2])
+    return outer_centre_pix + np.array([xfactor, yfactor]) * delta.astype(int)
@@ -0,0 +1,216 @@
+import math
+import random
+from functools import partial
+from types import SimpleNamespace
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+import pytest
+
+from smartem.data_model import Exposure, ExposureInfo, Particle, ParticleInfo, structure
+
+_MODES = {
+    "exposure": (["e_a", "e_b"], [], []),
+    "averaged": (["e_a"], ["p_a"], ["ps_a"]),
+    "particle": ([], ["p_a", "p_b"], []),
+}
+
+
+def _rows(seed: int, n_rows: int = 400) -> List[SimpleNamespace]:
+    rng = random.Random(seed)
+    special = [math.inf, -math.inf, math.nan]
+    rows = []
+    for _ in range(n_rows):
+        particle_id = rng.randrange(40)
+        value = rng.choice(special) if rng.random() < 0.1 else rng.uniform(-5, 5)
+        rows.append(
+            SimpleNamespace(
+                key=rng.choice(["e_a", "e_b", "p_a", "p_b", "ps_a"]),
+                value=value,
+                particle_id=particle_id,
+                exposure_name=f"exposure_{particle_id % 12}",
+                foil_hole_name=f"foil_hole_{particle_id % 12 % 5}",
+                grid_square_name=f"grid_square_{particle_id % 12 % 5 % 3}",
+            )
+        )
+    return rows
+
+
+def _reference(
+    rows: List[SimpleNamespace],
+    keys: List[str],
+    accumulate: bool,
+    use_particles: bool,
+    group_attr: Optional[str] = None,
+    limits: Optional[Dict[str, Tuple[float, float]]] = None,
+):
+    entity_values: Dict[object, Dict[str, List[float]]] = {}
+    group_values: Dict[str, Dict[str, List[float]]] = {k: {} for k in keys}
+    for row in rows:
+        if row.key not in keys:
+            continue
+        if limits is not None:
+            lower, upper = limits.get(row.key, (-np.inf, np.inf))
+            if not (row.value > lower and row.value < upper):
+                continue
+        if math.isinf(row.value):
+            continue
+        entity = row.particle_id if use_particles else row.exposure_name
+        entity_values.setdefault(entity, {}).setdefault(row.key, []).append(row.value)
+        if group_attr:
+            group_values[row.key].setdefault(getattr(row, group_attr), []).append(
+                row.value
+            )
+    complete = [v for v in entity_values.values() if all(k in v for k in keys)]
+    flat = {
+        k: np.array(
+            [np.mean(v[k]) if accumulate else v[k][-1] for v in complete],
+            dtype=float,
+        )
+        for k in keys
+    }
+    averages = {
+        k: {g: sum(v) / len(v) for g, v in groups.items()}
+        for k, groups in group_values.items()
+    }
+    counts = {
+        k: {g: len(v) for g, v in groups.items()} for k, groups in group_values.items()
+    }
+    return flat, averages, counts
+
+
+def _assert_averages_equal(actual: Dict[str, float], expected: Dict[str, float]):
+    assert sorted(actual) == sorted(expected)
+    np.testing.assert_allclose(
+        np.array([actual[g] for g in sorted(actual)], dtype=float),
+        np.array([expected[g] for g in sorted(expected)], dtype=float),
+    )
+
+
+@pytest.fixture(params=[3, 1000])
+def chunk_size(request, monkeypatch):
+    monkeypatch.setattr(
+        structure, "_chunks", partial(structure._chunks, size=request.param)
+    )
+    return request.param
+
+
+@pytest.mark.parametrize("mode", list(_MODES))
+@pytest.mark.parametrize("seed", range(5))
+def test_extract_keys_matches_reference(mode, seed, chunk_size):
+    exposure_keys, particle_keys, particle_set_keys = _MODES[mode]
+    keys = exposure_keys + particle_keys + particle_set_keys
+    rows = [r for r in _rows(seed) if r.key in keys]
+    sql_result = []
+    for r in rows:
+        if r.key in exposure_keys:
+            info = ExposureInfo(key=r.key, value=r.value)
+        else:
+            info = ParticleInfo(key=r.key, value=r.value)
+        sql_result.append(
+            (
+                info,
+                Particle(particle_id=r.particle_id),
+                Exposure(exposure_name=r.exposure_name),
+            )
+        )
+    expected, _, _ = _reference(
+        rows, keys, accumulate=mode == "averaged", use_particles=mode == "particle"
+    )
+    result = structure.extract_keys(
+        sql_result, exposure_keys, particle_keys, particle_set_keys
+    )
+    assert list(result) == keys
+    for k in keys:
+        np.testing.assert_allclose(result[k], expected[k])
+
+
+@pytest.mark.parametrize("mode", list(_MODES))
+@pytest.mark.parametrize("seed", range(5))
+def test_extract_keys_with_grid_square_averages_matches_reference(
+    mode, seed, chunk_size
+):
+    exposure_keys, particle_keys, particle_set_keys = _MODES[mode]
+    keys = exposure_keys + particle_keys + particle_set_keys
+    rows = [r for r in _rows(seed) if r.key in keys]
+    expected, averages, counts = _reference(
+        rows,
+        keys,
+        accumulate=mode == "averaged",
+        use_particles=mode == "particle",
+        group_attr="grid_square_name",
+    )
+    result = structure.extract_keys_with_grid_square_averages(
+        rows, exposure_keys, particle_keys, particle_set_keys
+    )
+    assert list(result) == keys
+    for k in keys:
+        np.testing.assert_allclose(result[k].flattened_data, expected[k])
+        _assert_averages_equal(result[k].averages, averages[k])
+        assert result[k].counts == counts[k]
+
+
+@pytest.mark.parametrize("mode", list(_MODES))
+@pytest.mark.parametrize("seed", range(5))
+@pytest.mark.parametrize("limits", [None, {"e_a": (-2, 3), "p_a": (0, np.inf)}])
+def test_extract_keys_with_foil_hole_averages_matches_reference(
+    mode, seed, limits, chunk_size
+):
+    exposure_keys, particle_keys, particle_set_keys = _MODES[mode]
+    keys = exposure_keys + particle_keys + particle_set_keys
+    rows = [r for r in _rows(seed) if r.key in keys]
+    expected, averages, counts = _reference(
+        rows,
+        keys,
+        accumulate=mode == "averaged",
+        use_particles=mode == "particle",
+        group_attr="foil_hole_name",
+        limits=limits or {},
+    )
+    result = structure.extract_keys_with_foil_hole_averages(
+        rows, exposure_keys, particle_keys, particle_set_keys, limits=limits
+    )
+    assert list(result) == keys
+    for k in keys:
+        np.testing.assert_allclose(result[k].flattened_data, expected[k])
+        _assert_averages_equal(result[k].averages, averages[k])
+        assert result[k].counts == counts[k]
+
+
+def test_extraction_semantics():
+    def row(key, value, exposure_name, particle_id=0):
+        return SimpleNamespace(
+            key=key,
+            value=value,
+            particle_id=particle_id,
+            exposure_name=exposure_name,
+            foil_hole_name="foil_hole",
+            grid_square_name="grid_square",
+        )
+
+    rows = [
+        row("a", 1.0, "first"),
+        row("b", 2.0, "first"),
+        row("a", 5.0, "first"),
+        row("a", math.inf, "first"),
+        row("a", math.nan, "second"),
+        row("b", 4.0, "second"),
+        row("a", 3.0, "partial"),
+        row("b", math.inf, "partial"),
+    ]
+    result = structure.extract_keys_with_grid_square_averages(rows, ["a", "b"], [], [])
+    # last value wins, inf is skipped, nan is kept and incomplete entities dropped
+    np.testing.assert_array_equal(result["a"].flattened_data, [5.0, np.nan])
+    np.testing.assert_array_equal(result["b"].flattened_data, [2.0, 4.0])
+    assert result["a"].counts == {"grid_square": 4}
+    assert math.isnan(result["a"].averages["grid_square"])
+    assert result["b"].averages == {"grid_square": 3.0}
+
+    limited = structure.extract_keys_with_foil_hole_averages(
+        rows, ["a", "b"], [], [], limits={"a": (1.0, 10.0)}
+    )
+    # limits are exclusive and also reject nan
+    np.testing.assert_array_equal(limited["a"].flattened_data, [5.0])
+    np.testing.assert_array_equal(limited["b"].flattened_data, [2.0])
+    assert limited["a"].averages == {"foil_hole": 4.0}
+    assert limited["a"].counts == {"foil_hole": 2}